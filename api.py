@@ -0,0 +1,174 @@
+"""
+Headless JSON API for the toolbox checks.
+
+Run it with any ASGI server, e.g.:
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Routes:
+    GET /health
+    GET /resolvers
+    GET /dns/{type}/{domain}?server=Cloudflare   (type ALL queries every record type)
+    GET /m365/{domain}
+    GET /mail/{domain}?selectors=selector1,google
+    GET /ssl/{host}?port=443
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from internal.dns.dns import DNS_SERVERS
+from internal.dns.latency import LATENCY
+from internal.dns.matrix import query_all_records, RECORD_TYPES
+from internal.m365.core import run_m365_check
+from internal.mail.core import analyze_mail_security, DKIM_SELECTORS, MAX_DKIM_SELECTORS
+from internal.ssl.certificate import summarize_certificate
+from internal.ssl.scanner import scan_target, MAX_CONCURRENT_SCANS, DEFAULT_PORT
+
+# Upper bound for checks running on worker threads at the same time, the rest wait in line
+MAX_BLOCKING_CHECKS = int(os.environ.get("DNSTOOLBOX_API_WORKERS", 64))
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+#MARK: - Request Coalescing
+class Coalescer:
+    """
+    Share the result of identical checks that are in flight at the same time.
+
+    A burst of requests for the same domain then costs a single set of
+    lookups. Results are not kept once the check has finished.
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    async def run(self, key, factory):
+        future = self._pending.get(key)
+        if future is None:
+            future = self._pending[key] = asyncio.ensure_future(factory())
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        # Shielded so a disconnecting client doesn't cancel the check for the others
+        return await asyncio.shield(future)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_BLOCKING_CHECKS, thread_name_prefix="api-check")
+_coalescer = Coalescer()
+_scan_slots = None
+
+async def run_blocking(func, *args):
+    """Run a blocking check on the bounded worker pool."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+#MARK: - Handlers
+def get_dns_servers(query):
+    """
+    Pick the DNS servers of a request by name, defaulting to all of them.
+
+    Only the configured DNS servers can be queried, so the API can't be used
+    to send requests to arbitrary hosts.
+    """
+    server = query.get("server")
+    if not server:
+        return dict(DNS_SERVERS)
+    if server not in DNS_SERVERS:
+        raise APIError(400, f"Unknown DNS server {server!r}, use one of {', '.join(DNS_SERVERS)}")
+    return {server: DNS_SERVERS[server]}
+
+async def handle_dns(record_type, domain, query):
+    record_type = record_type.upper()
+    record_types = RECORD_TYPES if record_type == "ALL" else [record_type]
+    if not set(record_types) <= set(RECORD_TYPES):
+        raise APIError(400, f"Unsupported record type {record_type}, use one of {', '.join(RECORD_TYPES)} or ALL")
+    dns_servers = get_dns_servers(query)
+    key = ("dns", domain, tuple(record_types), tuple(sorted(dns_servers.items())))
+    matrix = await _coalescer.run(key, lambda: run_blocking(query_all_records, domain, record_types, dns_servers))
+    return {"domain": domain, "records": matrix}
+
+async def handle_m365(domain, query):
+    return await _coalescer.run(("m365", domain), lambda: run_blocking(run_m365_check, domain))
+
+async def handle_mail(domain, query):
+    selectors = tuple(dict.fromkeys(
+        selector.strip() for selector in query.get("selectors", ",".join(DKIM_SELECTORS)).split(",") if selector.strip()
+    ))
+    # Every selector is another DNS lookup
+    if len(selectors) > MAX_DKIM_SELECTORS:
+        raise APIError(400, f"At most {MAX_DKIM_SELECTORS} DKIM selectors can be checked at once")
+    return await _coalescer.run(("mail", domain, selectors), lambda: run_blocking(analyze_mail_security, domain, None, selectors))
+
+async def handle_ssl(host, query):
+    try:
+        port = int(query.get("port", DEFAULT_PORT))
+    except ValueError:
+        raise APIError(400, "port must be a number")
+    if not 0 < port < 65536:
+        raise APIError(400, "port must be between 1 and 65535")
+
+    async def scan():
+        global _scan_slots
+        if _scan_slots is None:
+            _scan_slots = asyncio.Semaphore(MAX_CONCURRENT_SCANS)
+        async with _scan_slots:
+            return summarize_certificate(await scan_target(host, port))
+    return await _coalescer.run(("ssl", host, port), scan)
+
+async def route(method, path, query):
+    """Dispatch a request to its handler and return the response data."""
+    if method != "GET":
+        raise APIError(405, "Only GET is supported")
+    parts = [part for part in path.split("/") if part]
+    if parts == ["health"]:
+        return {"status": "ok"}
+    if parts == ["resolvers"]:
+        return {"resolvers": [
+            {"name": name, "dns_server": DNS_SERVERS[name], "health": LATENCY.health(DNS_SERVERS[name]), "score": LATENCY.score(DNS_SERVERS[name])}
+            for name in LATENCY.rank(DNS_SERVERS)
+        ]}
+    if len(parts) == 3 and parts[0] == "dns":
+        return await handle_dns(parts[1], normalize_domain(parts[2]), query)
+    if len(parts) == 2 and parts[0] == "m365":
+        return await handle_m365(normalize_domain(parts[1]), query)
+    if len(parts) == 2 and parts[0] == "mail":
+        return await handle_mail(normalize_domain(parts[1]), query)
+    if len(parts) == 2 and parts[0] == "ssl":
+        return await handle_ssl(normalize_domain(parts[1]), query)
+    raise APIError(404, "Not found")
+
+def normalize_domain(domain):
+    domain = domain.strip().rstrip(".").lower()
+    if not domain or len(domain) > 253 or any(not label or len(label) > 63 for label in domain.split(".")):
+        raise APIError(400, f"Invalid domain {domain!r}")
+    return domain
+
+#MARK: - ASGI App
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                _executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    query = {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+    try:
+        status, data = 200, await route(scope["method"], scope["path"], query)
+    except APIError as e:
+        status, data = e.status, {"error": str(e)}
+    except Exception as e:
+        status, data = 500, {"error": f"{type(e).__name__}: {e}"}
+
+    body = json.dumps(data).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -1,31 +1,14 @@
 import streamlit as st
-from internal.intro import get_intro
-from internal.dns.a import get_a_record
-from internal.dns.aaaa import get_aaaa_record
-from internal.dns.cname import get_cname_record
-from internal.dns.mx import get_mx_record
-from internal.dns.ns import get_ns_record
-from internal.dns.txt import get_txt_record
-from internal.ssl.check import invoke_ssl_check
-from internal.m365.check import invoke_m365_check
+from internal.pages import PAGES
+from internal.metrics import METRICS, start_metrics_server
 
 st.set_page_config(page_title="DNS-Toolbox", page_icon="🤖", layout="wide")
 
-#MARK: - Pages List
-page_names_to_funcs = {
-    "-": get_intro,
-    "M365 Check": invoke_m365_check,
-    "A Record": get_a_record,
-    "AAAA Record": get_aaaa_record,
-    "CNAME Record": get_cname_record,
-    "MX Record": get_mx_record,
-    "NS Record": get_ns_record,
-    "TXT Record": get_txt_record,
-    "SSL Check": invoke_ssl_check,
-}
-
+if METRICS.enabled:
+    start_metrics_server()
 
 #MARK: - Sidebar
-go_dnstoolbox = st.sidebar.selectbox("Choose a function", list(page_names_to_funcs.keys()))
+# Pages are imported when they are first selected, see internal/pages.py
+go_dnstoolbox = st.sidebar.selectbox("Choose a function", PAGES.names())
 go_dnstoolbox = go_dnstoolbox or "-"  # Assign a default value if go_dnstoolbox is None
-page_names_to_funcs[go_dnstoolbox]()
\ No newline at end of file
+PAGES.get(go_dnstoolbox)()
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, so every measurement starts with nothing imported
+CHILD = """
+import json, sys, time
+eager = sys.argv[1] == "eager"
+render = sys.argv[2] == "render"
+import streamlit
+started = time.perf_counter()
+if render:
+    from streamlit.testing.v1 import AppTest
+    if eager:
+        from internal.pages import PAGES
+        PAGES.load_all()
+    AppTest.from_file("app.py", default_timeout=60).run()
+else:
+    from internal.pages import PAGES
+    if eager:
+        PAGES.load_all()
+    else:
+        PAGES.get("-")
+elapsed = time.perf_counter() - started
+print(json.dumps({"elapsed": elapsed, "modules": len(sys.modules), "pandas": "pandas" in sys.modules}))
+"""
+
+#MARK: - Measurement
+def run_child(eager, render):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, "eager" if eager else "lazy", "render" if render else "import"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def bench(name, eager, render, repeat):
+    """Start the app `repeat` times and report the median time after streamlit itself is imported."""
+    runs = [run_child(eager, render) for _ in range(repeat)]
+    return {
+        "scenario": name,
+        "runs": repeat,
+        "median_ms": statistics.median(run["elapsed"] for run in runs) * 1000,
+        "min_ms": min(run["elapsed"] for run in runs) * 1000,
+        "modules": runs[-1]["modules"],
+        "pandas_loaded": runs[-1]["pandas"],
+    }
+
+# (eager, render) per scenario. The eager scenarios import every page up front,
+# like app.py did before the page registry
+SCENARIOS = {
+    "import_lazy": (False, False),
+    "import_eager": (True, False),
+    "render_lazy": (False, True),
+    "render_eager": (True, True),
+}
+
+#MARK: - CLI
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start of the app with lazy and eager page imports.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run: {', '.join(SCENARIOS.keys())} (default: all)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Fresh interpreters started per scenario")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per scenario")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS.keys())
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    for scenario in args.scenarios or SCENARIOS.keys():
+        result = bench(scenario, *SCENARIOS[scenario], args.repeat)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(
+                f"{result['scenario']:<13} runs={result['runs']:<3} median={result['median_ms']:8.1f}ms "
+                f"min={result['min_ms']:8.1f}ms modules={result['modules']:<5} pandas={result['pandas_loaded']}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.standin import StandInDNSServer, StandInHierarchy, StandInTLSServer
+from internal.dns import dns as dns_module
+from internal.dns.cache import DNS_CACHE
+from internal.dns.trace import DelegationTracer
+from internal.m365.core import fetch_m365_results
+from internal.ssl.certificate import leaf_certificate
+from internal.ssl.scanner import scan_targets
+
+#MARK: - Measurement
+def percentile(sorted_values, fraction):
+    """Return the value at the given fraction (0-1) of a sorted list, nearest rank."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class MemoryTracker:
+    """
+    Measures memory use of a scenario.
+
+    By default the process' peak resident set size is reported. With
+    trace set, the peak of Python allocations during the scenario is reported
+    instead, which is more precise but slows the scenario down considerably.
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+
+    def __enter__(self):
+        if self.trace:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def summarize(name, latencies, elapsed, peak_memory, errors):
+    """Turn raw latencies (seconds) into the reported numbers."""
+    latencies = sorted(latencies)
+    return {
+        "scenario": name,
+        "operations": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else None,
+        "throughput_per_s": len(latencies) / elapsed if elapsed else None,
+        "peak_memory_kib": peak_memory / 1024,
+    }
+
+def measure(name, operation, items, concurrency, trace_memory=False):
+    """
+    Run operation(item) for all items on a thread pool and summarize the results.
+
+    The operation returns True on success.
+    """
+    def timed(item):
+        started = time.perf_counter()
+        ok = operation(item)
+        return time.perf_counter() - started, ok
+
+    with MemoryTracker(trace_memory) as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed, items))
+        elapsed = time.perf_counter() - started
+    return summarize(name, [latency for latency, _ in results], elapsed, memory.peak, sum(1 for _, ok in results if not ok))
+
+#MARK: - Scenarios
+def bench_lookup(args):
+    """Single get_dns_record lookups of distinct names against one stand-in server."""
+    with StandInDNSServer(delay=args.delay, loss=args.loss) as server:
+        names = [f"host{i}.bench.test" for i in range(args.requests)]
+        def lookup(name):
+            return not get_error(dns_module.get_dns_record(name, server.nameserver, "A", args.lifetime, args.transport))
+        return measure("lookup", lookup, names, args.concurrency, args.trace_memory)
+
+def bench_m365(args):
+    """The full M365 fan-out against three stand-in servers replacing DNS_SERVERS."""
+    servers = [StandInDNSServer(delay=args.delay, loss=args.loss).start() for _ in range(3)]
+    original_servers = dict(dns_module.DNS_SERVERS)
+    try:
+        dns_module.DNS_SERVERS.update({name: server.nameserver for name, server in zip(original_servers, servers)})
+        domains = [f"tenant{i}.bench.test" for i in range(args.requests)]
+        def check(domain):
+            results = fetch_m365_results(domain, deadline=args.lifetime)
+            return not any(get_error(value) for server_results in results.values() for value in server_results.values())
+        return measure("m365", check, domains, args.concurrency, args.trace_memory)
+    finally:
+        dns_module.DNS_SERVERS.clear()
+        dns_module.DNS_SERVERS.update(original_servers)
+        for server in servers:
+            server.stop()
+
+def bench_ssl(args):
+    """A bulk scan of many connections to a stand-in TLS server."""
+    with StandInTLSServer(delay=args.delay, loss=args.loss) as server:
+        context = server.client_context()
+
+        async def run():
+            latencies = []
+            errors = 0
+            certificates = []
+            async for result in scan_targets([("localhost", server.port)] * args.requests, concurrency=args.concurrency,
+                                             context=context, connect_timeout=args.lifetime, handshake_timeout=args.lifetime):
+                if result["error"]:
+                    errors += 1
+                else:
+                    latencies.append(result["connect_time"] + result["handshake_time"])
+                    certificates.append(leaf_certificate(result))
+            # Check every certificate like a bulk audit does, the identical certificates are only parsed once
+            for certificate in certificates:
+                certificate.days_remaining()
+                certificate.matches("localhost")
+            return latencies, errors
+
+        with MemoryTracker(args.trace_memory) as memory:
+            started = time.perf_counter()
+            latencies, errors = asyncio.run(run())
+            elapsed = time.perf_counter() - started
+        return summarize("ssl", latencies, elapsed, memory.peak, errors)
+
+def bench_trace(args):
+    """Delegation traces from the root of a stand-in hierarchy, starting at cached delegations with --cache."""
+    with StandInHierarchy(delay=args.delay, loss=args.loss) as hierarchy:
+        tracer = DelegationTracer(hierarchy.root_servers, port=hierarchy.port, timeout=args.lifetime)
+        names = [f"host{i}.example.test." for i in range(args.requests)]
+        def trace(name):
+            return tracer.trace(name, "A", use_cache=args.cache)["rcode"] is not None
+        return measure("trace", trace, names, args.concurrency, args.trace_memory)
+
+def get_error(value):
+    """Return the error message of a check result, if it is one."""
+    if isinstance(value, list) and len(value) == 1 and value[0].startswith("Error:"):
+        return value[0]
+    return None
+
+SCENARIOS = {
+    "lookup": bench_lookup,
+    "m365": bench_m365,
+    "ssl": bench_ssl,
+    "trace": bench_trace,
+}
+
+#MARK: - CLI
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DNS and SSL checks against local stand-in servers.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run: {', '.join(SCENARIOS.keys())} (default: all)")
+    parser.add_argument("-n", "--requests", type=int, default=500, help="Operations per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Operations in flight at the same time")
+    parser.add_argument("--delay", type=float, default=0.0, help="Injected upstream delay in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="Probability of dropping a UDP query or TLS connection")
+    parser.add_argument("--lifetime", type=float, default=5.0, help="Timeout per operation in seconds")
+    parser.add_argument("--transport", choices=["udp", "tcp"], default="udp", help="Transport of the single lookups")
+    parser.add_argument("--cache", action="store_true", help="Keep the DNS answer and delegation caches enabled")
+    parser.add_argument("--trace-memory", action="store_true", help="Report traced Python allocations instead of the peak RSS")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per scenario")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS.keys())
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if not args.cache:
+        DNS_CACHE.max_bytes = 0
+    DNS_CACHE.clear()
+
+    for scenario in args.scenarios or SCENARIOS.keys():
+        result = SCENARIOS[scenario](args)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(
+                f"{result['scenario']:<8} n={result['operations']:<6} errors={result['errors']:<4} "
+                f"p50={result['p50_ms'] or 0:8.2f}ms p95={result['p95_ms'] or 0:8.2f}ms p99={result['p99_ms'] or 0:8.2f}ms "
+                f"throughput={result['throughput_per_s'] or 0:9.1f}/s peak_mem={result['peak_memory_kib']:9.1f}KiB"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+import asyncio
+import datetime
+import ipaddress
+import os
+import random
+import ssl
+import struct
+import tempfile
+import threading
+import dns.flags
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+# Answers synthesized for any name when a record is not configured explicitly
+SYNTHESIZED_ANSWERS = {
+    "A": ["192.0.2.1"],
+    "AAAA": ["2001:db8::1"],
+    "MX": ["0 {label}.mail.protection.outlook.com."],
+    "TXT": ['"v=spf1 include:spf.protection.outlook.com -all"', '"v=verifydomain MS=ms12345678"'],
+    "CNAME": ["{label}.cname.example."],
+    "NS": ["ns1.{zone}", "ns2.{zone}"],
+}
+
+#MARK: - Event Loop Thread
+class BackgroundLoop:
+    """An asyncio event loop running in a daemon thread."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine):
+        """Run a coroutine on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def stop(self):
+        """Cancel the remaining tasks, e.g. open client connections, and stop the loop."""
+        async def cancel_tasks():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.run(cancel_tasks())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+#MARK: - DNS Server
+class StandInDNSServer:
+    """
+    A local DNS server answering over UDP and TCP on the same port.
+
+    Configured records are answered as given. Any other name gets a
+    synthesized answer from SYNTHESIZED_ANSWERS when synthesize is set,
+    otherwise NODATA or NXDOMAIN. Names below a delegated zone get a referral
+    with glue instead. Every response is delayed by `delay` seconds and UDP
+    queries are dropped with probability `loss`, to simulate a slow or lossy
+    upstream.
+
+    Args:
+        records (dict): Answers as {(name, type): [rdata text, ...]}.
+        synthesize (bool): Answer unknown names with synthesized records.
+        delay (float): Delay before every response in seconds.
+        loss (float): Probability that a UDP query is dropped.
+        host (str): The address to listen on.
+        port (int): The port to listen on, 0 picks a free port.
+        ttl (int): TTL of all answers.
+        delegations (dict): Child zones as {zone: {nameserver name: [addresses]}}.
+        lame (bool): Refuse all queries, like a server that lost the zone.
+    """
+
+    def __init__(self, records=None, synthesize=True, delay=0.0, loss=0.0, host="127.0.0.1", port=0, ttl=300,
+                 delegations=None, lame=False):
+        self.records = {(dns.name.from_text(name), rdtype.upper()): rdatas for (name, rdtype), rdatas in (records or {}).items()}
+        self.names = {name for name, _ in self.records}
+        self.delegations = {dns.name.from_text(zone): nameservers for zone, nameservers in (delegations or {}).items()}
+        self.lame = lame
+        self.synthesize = synthesize
+        self.delay = delay
+        self.loss = loss
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.queries = 0
+        self._loop = None
+        self._servers = []
+
+    @property
+    def nameserver(self):
+        """The "address:port" string to use as dns_server."""
+        return f"{self.host}:{self.port}"
+
+    def start(self):
+        self._loop = BackgroundLoop()
+        self._loop.run(self._start())
+        return self
+
+    def stop(self):
+        async def close():
+            for server in self._servers:
+                server.close()
+        self._loop.run(close())
+        self._loop.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, wire):
+        """Build the response for a query in wire format."""
+        self.queries += 1
+        query = dns.message.from_wire(wire)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        if self.lame:
+            response.set_rcode(dns.rcode.REFUSED)
+            return response.to_wire()
+        delegation = max((zone for zone in self.delegations if question.name.is_subdomain(zone)), key=len, default=None)
+        if delegation is not None:
+            return self.refer(response, delegation)
+
+        response.flags |= dns.flags.AA
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        rdatas = self.records.get((question.name, rdtype))
+        if rdatas is None and self.synthesize:
+            rdatas = SYNTHESIZED_ANSWERS.get(rdtype)
+        if rdatas is None:
+            if question.name not in self.names:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+        else:
+            label = question.name.labels[0].decode()
+            zone = question.name.parent().to_text() if len(question.name) > 1 else "."
+            texts = [rdata.format(label=label, zone=zone) for rdata in rdatas]
+            response.answer.append(dns.rrset.from_text_list(question.name, self.ttl, "IN", rdtype, texts))
+        return response.to_wire()
+
+    def refer(self, response, zone):
+        """Turn response into a referral to the nameservers of a delegated zone."""
+        nameservers = self.delegations[zone]
+        response.authority.append(dns.rrset.from_text_list(zone, self.ttl, "IN", "NS", list(nameservers.keys())))
+        for name, addresses in nameservers.items():
+            if addresses:
+                response.additional.append(dns.rrset.from_text_list(name, self.ttl, "IN", "A", addresses))
+        return response.to_wire()
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        server = self
+
+        class UDPProtocol(asyncio.DatagramProtocol):
+            def connection_made(self, transport):
+                self.transport = transport
+
+            def datagram_received(self, data, addr):
+                if server.loss and random.random() < server.loss:
+                    return
+                wire = server.respond(data)
+                loop.call_later(server.delay, self.transport.sendto, wire, addr)
+
+        async def handle_tcp(reader, writer):
+            try:
+                while True:
+                    (length,) = struct.unpack("!H", await reader.readexactly(2))
+                    wire = self.respond(await reader.readexactly(length))
+                    await asyncio.sleep(self.delay)
+                    writer.write(struct.pack("!H", len(wire)) + wire)
+                    await writer.drain()
+            except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+                # Client disconnected or the server is stopping
+                pass
+            finally:
+                writer.close()
+
+        tcp_server = await asyncio.start_server(handle_tcp, self.host, self.port)
+        self.port = tcp_server.sockets[0].getsockname()[1]
+        udp_transport, _ = await loop.create_datagram_endpoint(UDPProtocol, local_addr=(self.host, self.port))
+        self._servers = [tcp_server, udp_transport]
+
+#MARK: - DNS Hierarchy
+# A root, a TLD and a domain whose third nameserver still serves an old address
+HIERARCHY_ZONES = {
+    ".": {"nameservers": {"a.root.test.": "127.0.0.11", "b.root.test.": "127.0.0.12"}},
+    "test.": {"nameservers": {"ns1.nic.test.": "127.0.0.21", "ns2.nic.test.": "127.0.0.22"}},
+    "example.test.": {
+        "nameservers": {"ns1.example.test.": "127.0.0.31", "ns2.example.test.": "127.0.0.32", "ns3.example.test.": "127.0.0.33"},
+        "records": {("www.example.test.", "A"): ["192.0.2.10"], ("mail.example.test.", "A"): ["192.0.2.20"]},
+        "overrides": {"ns3.example.test.": {("www.example.test.", "A"): ["192.0.2.99"]}},
+    },
+}
+
+class StandInHierarchy:
+    """
+    Authoritative stand-in servers for a tree of zones, from the root down.
+
+    Every nameserver listens on its own loopback address and all of them on
+    the same port, like real nameservers on port 53, so referrals can carry
+    plain glue addresses. Each zone is configured as
+
+        {"nameservers": {name: address}, "records": {(name, type): [rdata text, ...]}}
+
+    with the optional keys "overrides" ({nameserver name: records} replacing
+    records on single servers, e.g. stale data), "lame" (nameserver names that
+    refuse queries) and "delegation" ({name: address} announced by the parent
+    instead of the zone's own nameservers, None for a nameserver without glue).
+
+    Args:
+        zones (dict): The zones by name, see HIERARCHY_ZONES.
+        delay (float): Delay before every response in seconds.
+        loss (float): Probability that a UDP query is dropped.
+    """
+
+    def __init__(self, zones=HIERARCHY_ZONES, delay=0.0, loss=0.0):
+        self.zones = zones
+        self.delay = delay
+        self.loss = loss
+        self.port = 0
+        self.servers = {}
+
+    @property
+    def root_servers(self):
+        """The root nameservers as {name: "address:port"}, for DelegationTracer."""
+        return {name: f"{address}:{self.port}" for name, address in self.zones["."]["nameservers"].items()}
+
+    @property
+    def queries(self):
+        return sum(server.queries for server in self.servers.values())
+
+    def start(self):
+        for zone, config in self.zones.items():
+            records = dict(config.get("records", {}))
+            records.setdefault((zone, "NS"), list(config["nameservers"].keys()))
+            for name, address in config["nameservers"].items():
+                if dns.name.from_text(name).is_subdomain(dns.name.from_text(zone)):
+                    records.setdefault((name, "A"), [address])
+            delegations = {
+                child: {name: [address] if address else [] for name, address in child_config.get("delegation", child_config["nameservers"]).items()}
+                for child, child_config in self.zones.items()
+                if self.parent_zone(child) == zone
+            }
+            for name, address in config["nameservers"].items():
+                server = StandInDNSServer(
+                    {**records, **config.get("overrides", {}).get(name, {})}, synthesize=False,
+                    delay=self.delay, loss=self.loss, host=address, port=self.port,
+                    delegations=delegations, lame=name in config.get("lame", ()),
+                ).start()
+                self.port = server.port
+                self.servers[name] = server
+        return self
+
+    def parent_zone(self, zone):
+        """Return the closest configured zone above zone, None for the root."""
+        name = dns.name.from_text(zone)
+        while name != dns.name.root:
+            name = name.parent()
+            if name.to_text() in self.zones:
+                return name.to_text()
+        return None
+
+    def stop(self):
+        for server in self.servers.values():
+            server.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+#MARK: - Certificates
+def generate_certificates(directory, hostname="localhost"):
+    """
+    Create a CA and a leaf certificate for hostname (and 127.0.0.1) signed by it.
+
+    Returns:
+        tuple: Paths of the CA certificate, the leaf + CA chain and the leaf key.
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    def build(subject, issuer_cert, key, signing_key, extensions):
+        subject_name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, subject)])
+        builder = (
+            x509.CertificateBuilder()
+            .subject_name(subject_name)
+            .issuer_name(issuer_cert.subject if issuer_cert else subject_name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=90))
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+            .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(signing_key.public_key()), critical=False)
+        )
+        for extension, critical in extensions:
+            builder = builder.add_extension(extension, critical=critical)
+        return builder.sign(signing_key, hashes.SHA256())
+
+    def key_usage(digital_signature=False, key_cert_sign=False):
+        return x509.KeyUsage(
+            digital_signature=digital_signature, content_commitment=False, key_encipherment=False,
+            data_encipherment=False, key_agreement=False, key_cert_sign=key_cert_sign,
+            crl_sign=key_cert_sign, encipher_only=False, decipher_only=False,
+        )
+
+    ca_key = ec.generate_private_key(ec.SECP256R1())
+    ca_cert = build("DNS-Toolbox Benchmark CA", None, ca_key, ca_key, [
+        (x509.BasicConstraints(ca=True, path_length=None), True),
+        (key_usage(key_cert_sign=True), True),
+    ])
+    leaf_key = ec.generate_private_key(ec.SECP256R1())
+    leaf_cert = build(hostname, ca_cert, leaf_key, ca_key, [
+        (x509.BasicConstraints(ca=False, path_length=None), True),
+        (key_usage(digital_signature=True), True),
+        (x509.ExtendedKeyUsage([ExtendedKeyUsageOID.SERVER_AUTH]), False),
+        (x509.SubjectAlternativeName([x509.DNSName(hostname), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False),
+    ])
+
+    ca_path = os.path.join(directory, "ca.pem")
+    chain_path = os.path.join(directory, "chain.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(ca_path, "wb") as f:
+        f.write(ca_cert.public_bytes(serialization.Encoding.PEM))
+    with open(chain_path, "wb") as f:
+        f.write(leaf_cert.public_bytes(serialization.Encoding.PEM) + ca_cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(leaf_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return ca_path, chain_path, key_path
+
+#MARK: - TLS Server
+class StandInTLSServer:
+    """
+    A local TLS server presenting a generated certificate chain.
+
+    The handshake starts after `delay` seconds, and connections are dropped
+    before the handshake with probability `loss`.
+    """
+
+    def __init__(self, delay=0.0, loss=0.0, host="127.0.0.1", port=0, hostname="localhost"):
+        self.delay = delay
+        self.loss = loss
+        self.host = host
+        self.port = port
+        self.hostname = hostname
+        self._directory = tempfile.TemporaryDirectory()
+        self.ca_path, chain_path, key_path = generate_certificates(self._directory.name, hostname)
+        self._context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self._context.load_cert_chain(chain_path, key_path)
+        self._loop = None
+        self._server = None
+
+    def client_context(self):
+        """A client context trusting the generated CA."""
+        context = ssl.create_default_context(cafile=self.ca_path)
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        return context
+
+    def start(self):
+        self._loop = BackgroundLoop()
+        self._loop.run(self._start())
+        return self
+
+    def stop(self):
+        async def close():
+            self._server.close()
+        self._loop.run(close())
+        self._loop.stop()
+        self._directory.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        server = self
+
+        class TLSProtocol(asyncio.Protocol):
+            def connection_made(self, transport):
+                if server.loss and random.random() < server.loss:
+                    transport.abort()
+                    return
+                # Keep the ClientHello in the socket buffer until the handshake starts
+                transport.pause_reading()
+                loop.create_task(self.handshake(transport))
+
+            async def handshake(self, transport):
+                await asyncio.sleep(server.delay)
+                try:
+                    await loop.start_tls(transport, self, server._context, server_side=True)
+                except (ConnectionError, ssl.SSLError, OSError):
+                    transport.abort()
+
+        self._server = await loop.create_server(TLSProtocol, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
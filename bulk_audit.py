@@ -0,0 +1,36 @@
+import argparse
+import sys
+from internal.bulk.audit import iter_domains, run_audit, ResultWriter, CHECKS
+from internal.dns.dns import DNS_SERVERS
+
+#MARK: - Bulk Audit CLI
+def main():
+    parser = argparse.ArgumentParser(description="Audit a list of domains without the web interface.")
+    parser.add_argument("input", help="Text or CSV file with one domain per line, or - for stdin")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("-f", "--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("-c", "--checks", default=",".join(CHECKS), help="Comma separated list of checks to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Domains audited in parallel")
+    parser.add_argument("--rate-limit", type=float, default=50, help="Queries per second per DNS server (0 = unlimited)")
+    parser.add_argument("--dns-server", choices=list(DNS_SERVERS.keys()), help="Configured resolver for the DNS checks (default: the best scoring one)")
+    args = parser.parse_args()
+
+    checks = [check.strip() for check in args.checks.split(",") if check.strip()]
+    unknown = set(checks) - set(CHECKS)
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(sorted(unknown))}")
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8-sig", newline="")
+    output_file = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = ResultWriter(output_file, args.format)
+        for row in run_audit(iter_domains(input_file), checks, args.concurrency, args.rate_limit or None, DNS_SERVERS.get(args.dns_server)):
+            writer.write(row)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+if __name__ == "__main__":
+    main()
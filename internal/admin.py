@@ -0,0 +1,36 @@
+import streamlit as st
+import pandas as pd
+from internal.cache import CACHES
+from internal.dns.cache import DNS_CACHE
+from internal.ssl.certificate import CERTIFICATES
+
+#MARK: - Cache Admin
+def invoke_cache_admin():
+    st.write("# Cache Admin")
+    st.markdown(
+    """
+    Results of the checks are cached so that reruns of a page don't repeat the network requests.
+    DNS answers are cached for their TTL, M365 and SSL check results for a few minutes.
+    Parsed certificates are kept by fingerprint, so a certificate presented again is not parsed again.
+    Clear a cache to force fresh lookups.
+    """
+    )
+    dns_stats = DNS_CACHE.stats()
+    stats = [dict(name="dns_answers", entries=dns_stats["entries"], ttl=None, hits=dns_stats["hits"], misses=dns_stats["misses"], hit_rate=dns_stats["hit_rate"])]
+    stats += [cache.stats() for cache in CACHES.values()]
+    stats.append(CERTIFICATES.stats())
+    st.dataframe(pd.DataFrame(stats).set_index("name"))
+    st.caption(f"DNS answer cache: {dns_stats['bytes'] / 1024:.1f} KiB of {dns_stats['max_bytes'] / 1024:.0f} KiB used, {dns_stats['evictions']} evictions.")
+
+    names = ["All", "dns_answers"] + list(CACHES.keys()) + ["parsed_certificates"]
+    name = st.selectbox("Cache", names, key="cache_admin_name")
+    if st.button("Clear", key="cache_admin_clear"):
+        if name in ("All", "dns_answers"):
+            DNS_CACHE.clear()
+        for cache_name, cache in CACHES.items():
+            if name in ("All", cache_name):
+                cache.clear()
+        if name in ("All", "parsed_certificates"):
+            CERTIFICATES.clear()
+        # Rerun so the table above shows the emptied caches
+        st.rerun()
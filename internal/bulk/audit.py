@@ -0,0 +1,161 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from internal.dns.dns import get_dns_record, DNS_SERVERS
+from internal.dns.pool import best_dns_server
+from internal.dns.ratelimit import RATE_LIMITER
+from internal.m365.core import fetch_m365_results, get_record_status, find_discrepancies, RECORD_CHECKS
+from internal.ssl.certificate import leaf_certificate, format_name, format_cert_time
+from internal.ssl.scanner import scan_ssl_certificate
+
+CHECKS = ["m365", "dns", "ssl"]
+DNS_RECORD_TYPES = ["A", "AAAA", "MX", "NS", "TXT"]
+SSL_TIMEOUT = 10.0
+
+FIELDNAMES = (
+    ["domain"]
+    + [f"m365_{record_type}" for record_type in RECORD_CHECKS.keys()]
+    + ["m365_consistent"]
+    + [f"dns_{record_type}" for record_type in DNS_RECORD_TYPES]
+    + ["ssl_days_remaining", "ssl_not_after", "ssl_issuer", "ssl_error", "error"]
+)
+
+#MARK: - Input
+def iter_domains(lines):
+    """
+    Yield the domains from an uploaded CSV or plain text list, one per line.
+
+    Only the first CSV column is used. Blank lines, comments starting with "#",
+    a "domain" header and duplicates are skipped.
+    """
+    seen = set()
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        domain = row[0].strip().rstrip(".").lower()
+        if not domain or domain.startswith("#") or domain == "domain" or domain in seen:
+            continue
+        seen.add(domain)
+        yield domain
+
+#MARK: - Checks
+def audit_m365(domain):
+    """Summarize the M365 check of a domain as one status per record type."""
+    dns_results = fetch_m365_results(domain)
+    row = {f"m365_{record_type}": get_record_status(dns_results, record_type) for record_type in RECORD_CHECKS.keys()}
+    row["m365_consistent"] = not find_discrepancies(dns_results, RECORD_CHECKS)
+    return row
+
+def audit_dns(domain, dns_server):
+    """Count the records of each type, or report the lookup error."""
+    row = {}
+    for record_type in DNS_RECORD_TYPES:
+        records = get_dns_record(domain, dns_server, record_type)
+        row[f"dns_{record_type}"] = records[0] if len(records) == 1 and records[0].startswith("Error:") else len(records)
+    return row
+
+def audit_ssl(domain):
+    """
+    Report the expiry date and issuer of the domain's certificate, and why it failed verification.
+
+    The chain of a certificate that fails verification is captured anyway, so
+    expired and untrusted certificates still report their expiry and issuer.
+    """
+    scan_result = scan_ssl_certificate(domain, timeout=SSL_TIMEOUT, capture_failures=True)
+    # Parsed through the shared cache, so the certificates of shared hosting are parsed once per audit
+    certificate = leaf_certificate(scan_result)
+    if certificate is None:
+        return {"ssl_days_remaining": None, "ssl_error": scan_result["error"]}
+    return {
+        "ssl_days_remaining": certificate.days_remaining(),
+        "ssl_not_after": format_cert_time(certificate.not_after),
+        "ssl_issuer": format_name(certificate.issuer),
+        "ssl_error": scan_result["error"],
+    }
+
+def audit_domain(domain, checks=CHECKS, dns_server=None):
+    """
+    Run the selected checks for one domain.
+
+    Returns:
+        dict: A flat row with the FIELDNAMES keys. Failures are reported in the "error" column.
+    """
+    dns_server = dns_server or DNS_SERVERS[best_dns_server()]
+    row = dict.fromkeys(FIELDNAMES)
+    row["domain"] = domain
+    errors = []
+    for check in checks:
+        try:
+            if check == "m365":
+                row.update(audit_m365(domain))
+            elif check == "dns":
+                row.update(audit_dns(domain, dns_server))
+            elif check == "ssl":
+                row.update(audit_ssl(domain))
+        except Exception as e:
+            errors.append(f"{check}: {e}")
+    row["error"] = "; ".join(errors) or None
+    return row
+
+#MARK: - Scheduler
+def run_bounded(func, items, concurrency):
+    """
+    Apply func to every item with at most `concurrency` calls in flight.
+
+    Items are pulled lazily and results are yielded as soon as they complete,
+    so memory use does not grow with the number of items.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        for item in items:
+            pending.add(executor.submit(func, item))
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def run_audit(domains, checks=CHECKS, concurrency=8, rate_limit=None, dns_server=None):
+    """
+    Audit a stream of domains and yield one row per domain as it completes.
+
+    Args:
+        domains (iterable): The domains to audit.
+        checks (list): Any of "m365", "dns" and "ssl".
+        concurrency (int): Number of domains audited in parallel.
+        rate_limit (float): Maximum queries per second sent to each DNS server.
+        dns_server (str): The DNS server used for the record checks, defaults to the best scoring one.
+    """
+    dns_server = dns_server or DNS_SERVERS[best_dns_server()]
+    nameservers = set(DNS_SERVERS.values()) | {dns_server}
+    # The limiter is shared by the whole process, restore the previous limits once the audit is done
+    previous = {nameserver: RATE_LIMITER.get_limit(nameserver) for nameserver in nameservers}
+    try:
+        for nameserver in nameservers:
+            RATE_LIMITER.set_limit(nameserver, rate_limit)
+        yield from run_bounded(lambda domain: audit_domain(domain, checks, dns_server), domains, concurrency)
+    finally:
+        for nameserver, limit in previous.items():
+            RATE_LIMITER.set_limit(nameserver, *(limit or (None,)))
+
+#MARK: - Output
+class ResultWriter:
+    """Write audit rows to a file as JSON lines or CSV, flushing after every row."""
+
+    def __init__(self, file, format="jsonl"):
+        self.file = file
+        self.format = format
+        if format == "csv":
+            self._csv = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            self._csv.writeheader()
+
+    def write(self, row):
+        if self.format == "csv":
+            self._csv.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
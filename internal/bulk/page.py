@@ -0,0 +1,64 @@
+import io
+import tempfile
+import streamlit as st
+from internal.dns.dns import DNS_SERVERS
+from internal.bulk.audit import iter_domains, run_audit, ResultWriter, CHECKS, FIELDNAMES
+from internal.results import ResultTable, display_result_table
+
+# Number of most recent rows kept on screen while the audit is running
+PREVIEW_ROWS = 100
+# Largest result file offered for download, st.download_button holds the whole file in memory
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+# Result columns with a handful of distinct values, stored once per value and filterable
+CATEGORICAL_FIELDS = [field for field in FIELDNAMES if field.startswith("m365_")] + ["ssl_issuer"]
+
+#MARK: - Bulk Audit
+def invoke_bulk_audit():
+    st.write("# Bulk Audit")
+    st.markdown(
+    """
+    A bulk audit runs the M365, DNS record and SSL checks for a whole list of domains.
+    Upload a text file with one domain per line, or a CSV file with the domains in the first column.
+    Results are shown as they arrive and can be downloaded once the audit is finished.
+    The page keeps the results in memory, audit very large lists with the `bulk_audit.py` command line tool,
+    which streams the results to a file.
+    """
+    )
+    uploaded_file = st.file_uploader("Domains", type=["csv", "txt"], key="bulk_audit_file")
+    checks = st.multiselect("Checks", CHECKS, default=CHECKS, key="bulk_audit_checks")
+    dns_server = st.selectbox("DNS Server", list(DNS_SERVERS.keys()), key="bulk_audit_dns_server")
+    concurrency = st.slider("Domains in parallel", 1, 64, 8, key="bulk_audit_concurrency")
+    rate_limit = st.number_input("Queries per second per DNS server (0 = unlimited)", 0, 1000, 50, key="bulk_audit_rate_limit")
+    output_format = st.selectbox("Download format", ["jsonl", "csv"], key="bulk_audit_format") or "jsonl"
+
+    if uploaded_file is not None and st.button("Start", key="bulk_audit_start"):
+        domains = iter_domains(io.TextIOWrapper(uploaded_file, encoding="utf-8-sig"))
+        progress = st.empty()
+        preview = st.empty()
+
+        with tempfile.TemporaryFile("w+", suffix=f".{output_format}") as output:
+            writer = ResultWriter(output, output_format)
+            # Kept in the session so the results can be filtered and paged through after the audit
+            results = st.session_state["bulk_audit_results"] = ResultTable(FIELDNAMES, CATEGORICAL_FIELDS)
+            for row in run_audit(domains, checks, concurrency, rate_limit or None, DNS_SERVERS[dns_server]):
+                writer.write(row)
+                results.append(row)
+                progress.info(f"Checked {len(results)} domains...")
+                preview.dataframe(results.slice(range(max(0, len(results) - PREVIEW_ROWS), len(results))), hide_index=True)
+
+            preview.empty()
+            progress.success(f"Checked {len(results)} domains.")
+            size = output.tell()
+            if size > MAX_DOWNLOAD_BYTES:
+                st.warning(
+                    f"The results are too large to download here ({size / 1024 / 1024:.0f} MB). "
+                    "Run `python bulk_audit.py domains.txt -o results.jsonl` instead, it writes them to a file as they arrive."
+                )
+            else:
+                output.seek(0)
+                st.download_button("Download results", output.read(), file_name=f"audit.{output_format}", key="bulk_audit_download")
+
+    results = st.session_state.get("bulk_audit_results")
+    if results is not None:
+        st.subheader("Results")
+        display_result_table(results, key="bulk_audit_table")
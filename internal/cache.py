@@ -0,0 +1,96 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+import streamlit as st
+
+# All memoized functions by name, shown on the cache admin page
+CACHES = {}
+
+#MARK: - Result Cache
+class ResultCache:
+    """Thread-safe LRU cache for computed results that expire after a fixed time."""
+
+    def __init__(self, name, ttl, max_entries=1024):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) for a fresh entry, otherwise (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+def memoize(name, ttl, max_entries=1024, cache_if=None):
+    """
+    Cache the results of a function by its arguments for ttl seconds.
+
+    The cache is shared by all sessions and registered in CACHES under the
+    given name. Exceptions are not cached, and neither are results for which
+    the optional cache_if predicate returns False.
+    """
+    def decorator(func):
+        cache = CACHES[name] = ResultCache(name, ttl, max_entries)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            found, value = cache.get(key)
+            if not found:
+                value = func(*args, **kwargs)
+                if cache_if is None or cache_if(value):
+                    cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+#MARK: - Session State
+def remember_check(key, pressed, **inputs):
+    """
+    Decide whether a page should show its results.
+
+    Results are shown when the check button was pressed, and on every later
+    rerun of the session as long as the given inputs are unchanged. This keeps
+    the results on screen when other widgets on the page are used.
+    """
+    if pressed:
+        st.session_state[key] = inputs
+        return True
+    return st.session_state.get(key) == inputs
@@ -0,0 +1,73 @@
+import streamlit as st
+import pandas as pd
+from internal.dns.latency import LATENCY
+from internal.metrics import METRICS, METRICS_PORT, Histogram, start_metrics_server
+
+#MARK: - Diagnostics
+def summarize_histograms(name, group_by):
+    """Merge the histograms of a metric by the given labels and estimate count, p50 and p95 per group."""
+    merged = {}
+    for (histogram_name, labels), histogram in list(METRICS.histograms.items()):
+        if histogram_name != name:
+            continue
+        labels = dict(labels)
+        group = tuple(labels.get(label, "") for label in group_by)
+        # All histograms share the same buckets, so merging them adds up their bucket counts
+        total = merged.setdefault(group, Histogram(histogram.buckets))
+        total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+        total.count += histogram.count
+        total.sum += histogram.sum
+
+    summary = []
+    for group, histogram in sorted(merged.items()):
+        if not histogram.count:
+            continue
+        summary.append(dict(
+            zip(group_by, group), count=histogram.count, mean_ms=histogram.sum / histogram.count * 1000,
+            p50_ms=histogram.quantile(0.5) * 1000, p95_ms=histogram.quantile(0.95) * 1000,
+        ))
+    return pd.DataFrame(summary)
+
+def invoke_diagnostics():
+    st.write("# Diagnostics")
+    st.markdown(
+    f"""
+    Timing of the DNS queries and TLS handshakes made by this server.
+    Enable collection with the `DNSTOOLBOX_METRICS=1` environment variable or the toggle below, the metrics
+    are then also served in the Prometheus text format on port {METRICS_PORT} under `/metrics`.
+    """
+    )
+    METRICS.enabled = st.toggle("Collect metrics", METRICS.enabled, key="diagnostics_enabled")
+    if METRICS.enabled:
+        # Started once per process, a no-op when the app already started it at startup
+        try:
+            start_metrics_server()
+        except OSError as e:
+            st.warning(f"The metrics are collected but can't be served on port {METRICS_PORT}: {e}")
+    if st.button("Reset", key="diagnostics_reset"):
+        METRICS.clear()
+
+    hits = METRICS.counters.get(("dnstoolbox_dns_cache_lookups_total", (("result", "hit"),)), 0)
+    misses = METRICS.counters.get(("dnstoolbox_dns_cache_lookups_total", (("result", "miss"),)), 0)
+    st.metric("DNS cache hit rate", f"{hits / (hits + misses):.0%}" if hits + misses else "-")
+
+    st.subheader("DNS Queries by Resolver")
+    queries = summarize_histograms("dnstoolbox_dns_query_duration_seconds", ["resolver", "rcode"])
+    st.dataframe(queries, hide_index=True) if not queries.empty else st.info("No DNS queries recorded yet.")
+
+    st.subheader("Resolver Health")
+    st.caption("Rolling latency and success rate of every DNS server. Automatic lookups prefer the best scoring servers and avoid the ones that are down.")
+    latency = pd.DataFrame(LATENCY.snapshot())
+    st.dataframe(latency, hide_index=True) if not latency.empty else st.info("No DNS queries sent yet.")
+
+    st.subheader("TLS Handshakes")
+    st.caption("OpenSSL verifies the certificate chain during the handshake, so the verification time is part of the handshake time. Failed verifications are listed with the outcome verify_failed.")
+    handshakes = summarize_histograms("dnstoolbox_tls_handshake_duration_seconds", ["outcome", "protocol"])
+    st.dataframe(handshakes, hide_index=True) if not handshakes.empty else st.info("No TLS handshakes recorded yet.")
+
+    st.subheader("Recent Spans")
+    spans = pd.DataFrame(list(METRICS.spans))
+    if not spans.empty:
+        spans["time"] = pd.to_datetime(spans["time"], unit="s")
+        spans["duration_ms"] = spans.pop("duration") * 1000
+        st.dataframe(spans.iloc[::-1], hide_index=True)
@@ -1,5 +1,7 @@
 import streamlit as st
-from internal.dns.dns import get_dns_record, DNS_SERVERS
+from internal.dns.pool import get_dns_server_options, describe_dns_server, resolve_record
+from internal.cache import remember_check
+from internal.results import display_records
 
 #MARK: - DNS Functions - A Record
 def get_a_record():
@@ -11,12 +13,14 @@ def get_a_record():
     """
     )
     domain = st.text_input("Domain", "example.com", key="a_record_domain")
-    dns_server = st.selectbox("DNS Server", list(DNS_SERVERS.keys()), key="a_record_dns_server", ) or DNS_SERVERS["Cloudflare"]
-    if st.button("Check", key="a_record_check"):
+    dns_server = st.selectbox("DNS Server", get_dns_server_options(), format_func=describe_dns_server, key="a_record_dns_server")
+    fastest = st.checkbox("Fastest answer", key="a_record_fastest", help="Also ask the other DNS servers if the chosen one is slow or fails.")
+    if remember_check("a_record_checked", st.button("Check", key="a_record_check"), domain=domain):
         with st.spinner("Checking..."):
-            result = get_dns_record(domain or "", DNS_SERVERS.get(dns_server), "A")
+            result, answered_by = resolve_record(domain or "", dns_server, "A", hedge=fastest)
             if len(result) == 1 and result[0].startswith("Error:"):
                 st.error(result[0])
             else:
-                for i, record in enumerate(result):
-                    st.info(f"Record {i+1}: {record}")
\ No newline at end of file
+                if answered_by != dns_server:
+                    st.caption(f"Answered by {answered_by}.")
+                display_records(result, key="a_record_results")
\ No newline at end of file
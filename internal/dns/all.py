@@ -0,0 +1,40 @@
+import streamlit as st
+import pandas as pd
+from internal.dns.matrix import query_all_records, is_consistent
+from internal.cache import remember_check
+
+#MARK: - DNS Functions - All Records
+def get_all_records():
+    st.write("# All Records")
+    st.markdown(
+    """
+    This queries the A, AAAA, CNAME, MX, NS and TXT records of a (sub-)domain on all DNS servers at once.
+    Differences between the DNS servers are highlighted, and the response time of every query is shown.
+    """
+    )
+    domain = st.text_input("Domain", "example.com", key="a_record_domain")
+    if remember_check("all_records_checked", st.button("Check", key="all_records_check"), domain=domain):
+        with st.spinner("Checking..."):
+            matrix = query_all_records(domain or "")
+
+        records = pd.DataFrame({
+            record_type: {dns_server_name: "\n".join(cell["records"]) for dns_server_name, cell in row.items()}
+            for record_type, row in matrix.items()
+        }).T
+        latencies = pd.DataFrame({
+            record_type: {dns_server_name: None if cell["latency"] is None else round(cell["latency"] * 1000, 1) for dns_server_name, cell in row.items()}
+            for record_type, row in matrix.items()
+        }).T
+
+        inconsistent = [record_type for record_type, row in matrix.items() if not is_consistent(row)]
+        if inconsistent:
+            st.warning(f"The DNS servers disagree on: {', '.join(inconsistent)}")
+        else:
+            st.success("All DNS servers returned the same records.")
+
+        st.subheader("Records")
+        st.dataframe(records.style.apply(
+            lambda row: ["background-color: rgba(255, 75, 75, 0.2)" if row.name in inconsistent else "" for _ in row], axis=1
+        ))
+        st.subheader("Response Time (ms)")
+        st.dataframe(latencies)
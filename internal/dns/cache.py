@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry bookkeeping cost (key tuple, entry tuple, OrderedDict node)
+ENTRY_OVERHEAD = 256
+
+DEFAULT_MAX_BYTES = int(os.environ.get("DNSTOOLBOX_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+#MARK: - Answer Cache
+class DNSAnswerCache:
+    """
+    Process-wide LRU cache for DNS answers, keyed by (qname, type, nameserver).
+
+    Entries expire after the TTL they were stored with, and the least recently
+    used entries are evicted once the estimated memory use exceeds max_bytes.
+    A max_bytes of 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(domain, dns_server, type):
+        """Normalize a query so equivalent spellings share one entry."""
+        return (domain.rstrip(".").lower(), type.upper(), dns_server)
+
+    def get(self, key):
+        """
+        Look up a cached answer.
+
+        Returns:
+            tuple: (records, remaining_ttl) if a fresh entry exists, otherwise None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, records, size = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(records), int(expires_at - now)
+
+    def put(self, key, records, ttl):
+        """Store an answer for ttl seconds, evicting old entries if needed."""
+        if ttl <= 0 or self.max_bytes <= 0:
+            return
+        records = tuple(records)
+        size = ENTRY_OVERHEAD + sum(sys.getsizeof(record) for record in records)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, records, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return the current size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+DNS_CACHE = DNSAnswerCache()
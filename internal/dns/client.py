@@ -0,0 +1,264 @@
+import importlib.util
+import socket
+import threading
+import time
+import dns.exception
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.resolver
+from internal.ssl.context import get_tls_context
+
+TRANSPORTS = ["udp", "tcp", "tls", "https"]
+DEFAULT_PORTS = {"udp": 53, "tcp": 53, "tls": 853, "https": 443}
+
+# Idle connections kept per (nameserver, transport) and how long they may stay idle
+MAX_IDLE_CONNECTIONS = 4
+IDLE_TIMEOUT = 30.0
+DEFAULT_TIMEOUT = 5.0
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+#MARK: - Nameservers
+def split_nameserver(nameserver, default_port=53):
+    """
+    Split a nameserver into (address, port).
+
+    Accepts "address", "IPv4:port" and "[IPv6]:port". A bare IPv6 address
+    uses the default port.
+    """
+    if nameserver.startswith("["):
+        address, _, rest = nameserver[1:].partition("]")
+        return address, int(rest[1:]) if rest.startswith(":") else default_port
+    if nameserver.count(":") == 1:
+        address, port = nameserver.split(":")
+        return address, int(port)
+    return nameserver, default_port
+
+def join_nameserver(address, port=53):
+    """Inverse of split_nameserver, the port is left out if it is 53."""
+    if port == 53:
+        return address
+    return f"[{address}]:{port}" if ":" in address else f"{address}:{port}"
+
+def split_transport(dns_server, default="udp"):
+    """
+    Split a DNS server into (transport, nameserver).
+
+    DNS servers are written as "address[:port]" for the default transport or
+    with a scheme, "udp://", "tcp://" or "tls://" followed by the address, or
+    the "https://" URL of a DNS-over-HTTPS endpoint, which is kept as is.
+    """
+    scheme, separator, rest = dns_server.partition("://")
+    if not separator:
+        return default, dns_server
+    if scheme not in TRANSPORTS:
+        raise ValueError(f"Unsupported DNS transport {scheme!r}, use one of {', '.join(TRANSPORTS)}")
+    return scheme, dns_server if scheme == "https" else rest
+
+#MARK: - Resolvers
+def get_resolver(nameserver):
+    """
+    Return the shared Resolver for a nameserver.
+
+    Resolvers are created without reading /etc/resolv.conf and are never
+    modified after creation, so they are safe to use from several threads.
+    Pass per-query settings such as the lifetime to resolve() instead.
+    """
+    resolver = _resolvers.get(nameserver)
+    if resolver is None:
+        with _resolvers_lock:
+            resolver = _resolvers.get(nameserver)
+            if resolver is None:
+                address, port = split_nameserver(nameserver)
+                resolver = dns.resolver.Resolver(configure=False)
+                resolver.nameservers = [address]
+                resolver.port = port
+                _resolvers[nameserver] = resolver
+    return resolver
+
+#MARK: - Connection Pool
+class DNSConnectionPool:
+    """
+    Keeps TCP and DNS-over-TLS connections to upstream resolvers open between queries.
+
+    A connection is used by one query at a time. After the query it is returned
+    to the pool and reused by the next query to the same nameserver, which saves
+    the TCP (and TLS) handshake. Connections closed by the server are replaced
+    transparently.
+    """
+
+    def __init__(self, max_idle=MAX_IDLE_CONNECTIONS, idle_timeout=IDLE_TIMEOUT):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def query(self, message, nameserver, transport, timeout=DEFAULT_TIMEOUT):
+        """Send a query message over a pooled connection and return the response message."""
+        key = (nameserver, transport)
+        deadline = time.monotonic() + timeout
+        sock, reused = self._checkout(key, timeout)
+        try:
+            response = self._send(message, sock, nameserver, transport, timeout)
+        except (OSError, EOFError, dns.exception.DNSException):
+            sock.close()
+            if not reused:
+                raise
+            # The server may have closed the idle connection, retry once on a fresh one
+            # within what is left of the timeout
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise dns.exception.Timeout(timeout=timeout)
+            sock = self._connect(nameserver, transport, remaining)
+            try:
+                response = self._send(message, sock, nameserver, transport, max(0.0, deadline - time.monotonic()))
+            except BaseException:
+                sock.close()
+                raise
+        self._checkin(key, sock)
+        return response
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for sock, _ in connections:
+                sock.close()
+
+    def _checkout(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            connections = self._idle.get(key, [])
+            while connections:
+                sock, last_used = connections.pop()
+                if now - last_used < self.idle_timeout:
+                    return sock, True
+                sock.close()
+        return self._connect(key[0], key[1], timeout), False
+
+    def _checkin(self, key, sock):
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.max_idle:
+                connections.append((sock, time.monotonic()))
+                return
+        sock.close()
+
+    @staticmethod
+    def _connect(nameserver, transport, timeout):
+        address, port = split_nameserver(nameserver, DEFAULT_PORTS[transport])
+        sock = socket.create_connection((address, port), timeout=timeout)
+        if transport == "tls":
+            try:
+                sock = get_tls_context().wrap_socket(sock, server_hostname=address)
+            except BaseException:
+                sock.close()
+                raise
+        return sock
+
+    @staticmethod
+    def _send(message, sock, nameserver, transport, timeout):
+        address, port = split_nameserver(nameserver, DEFAULT_PORTS[transport])
+        if transport == "tls":
+            return dns.query.tls(message, address, timeout=timeout, port=port, sock=sock)
+        return dns.query.tcp(message, address, timeout=timeout, port=port, sock=sock)
+
+CONNECTION_POOL = DNSConnectionPool()
+
+def resolve_over_connection(domain, nameserver, type, transport, lifetime=None):
+    """
+    Resolve a record over a pooled TCP or DNS-over-TLS connection.
+
+    Raises the same dns.resolver exceptions as Resolver.resolve, so callers can
+    handle both paths alike.
+
+    Returns:
+        dns.message.Message: The response containing the answer.
+    """
+    qname = dns.name.from_text(domain)
+    message = dns.message.make_query(qname, type)
+    port = split_nameserver(nameserver, DEFAULT_PORTS[transport])[1]
+    try:
+        response = CONNECTION_POOL.query(message, nameserver, transport, lifetime or DEFAULT_TIMEOUT)
+    except dns.exception.Timeout:
+        raise dns.resolver.LifetimeTimeout(timeout=lifetime or DEFAULT_TIMEOUT, errors=[])
+    except (OSError, EOFError, dns.exception.FormError, dns.query.BadResponse) as e:
+        # Connections closed mid-response and malformed or mismatched replies are failures of this server
+        raise dns.resolver.NoNameservers(request=message, errors=[(nameserver, True, port, e, None)])
+
+    return check_response(qname, message, response, nameserver, port)
+
+def check_response(qname, message, response, nameserver, port):
+    """Raise the dns.resolver exception Resolver.resolve would raise for an unsuccessful response."""
+    rcode = response.rcode()
+    if rcode == dns.rcode.NXDOMAIN:
+        raise dns.resolver.NXDOMAIN(qnames=[qname], responses={qname: response})
+    if rcode != dns.rcode.NOERROR:
+        raise dns.resolver.NoNameservers(request=message, errors=[(nameserver, True, port, dns.rcode.to_text(rcode), response)])
+    if not response.answer:
+        raise dns.resolver.NoAnswer(response=response)
+    return response
+
+#MARK: - DNS-over-HTTPS
+DOH_HEADERS = {"content-type": "application/dns-message", "accept": "application/dns-message"}
+
+_https_client = None
+_https_client_lock = threading.Lock()
+
+def get_https_client():
+    """
+    Return the shared HTTP client for DNS-over-HTTPS, created on first use.
+
+    The client keeps connections to the DoH endpoints alive between queries
+    and uses HTTP/2 when the h2 package is installed.
+    """
+    global _https_client
+    with _https_client_lock:
+        if _https_client is None:
+            try:
+                import httpx
+            except ImportError:
+                raise RuntimeError("DNS-over-HTTPS needs the httpx package, install it with `pip install httpx`.")
+            _https_client = httpx.Client(
+                verify=get_tls_context(),
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_keepalive_connections=MAX_IDLE_CONNECTIONS * 8, keepalive_expiry=IDLE_TIMEOUT),
+            )
+    return _https_client
+
+def resolve_over_https(domain, url, type, lifetime=None):
+    """
+    Resolve a record at a DNS-over-HTTPS endpoint (RFC 8484) over a kept-alive connection.
+
+    The POST is sent with the shared httpx client instead of dns.query.https:
+    dnspython 2.9 implements DoH with the separate httpx2 package and only
+    accepts an httpx2.Client as session, so it could not reuse the connections
+    of the client from get_https_client.
+
+    Raises the same dns.resolver exceptions as Resolver.resolve.
+
+    Returns:
+        dns.message.Message: The response containing the answer.
+    """
+    import httpx
+
+    qname = dns.name.from_text(domain)
+    message = dns.message.make_query(qname, type)
+    # RFC 8484 recommends the ID 0, so identical queries can be cached by HTTP caches
+    message.id = 0
+    timeout = lifetime or DEFAULT_TIMEOUT
+    try:
+        reply = get_https_client().post(url, content=message.to_wire(), timeout=timeout, headers=DOH_HEADERS)
+        reply.raise_for_status()
+        response = dns.message.from_wire(reply.content)
+        if not message.is_response(response):
+            raise dns.query.BadResponse()
+    except httpx.TimeoutException:
+        raise dns.resolver.LifetimeTimeout(timeout=timeout, errors=[])
+    except (httpx.HTTPError, OSError, dns.exception.DNSException) as e:
+        raise dns.resolver.NoNameservers(request=message, errors=[(url, True, DEFAULT_PORTS["https"], e, None)])
+    return check_response(qname, message, response, url, DEFAULT_PORTS["https"])
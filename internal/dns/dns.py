@@ -1,24 +1,150 @@
+import dns.rdatatype
 import dns.resolver
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from internal.dns.cache import DNS_CACHE
+from internal.dns.client import get_resolver, resolve_over_connection, resolve_over_https, split_transport
+from internal.dns.latency import LATENCY
+from internal.dns.ratelimit import RATE_LIMITER
+from internal.dns.resolvers import load_resolvers
+from internal.metrics import METRICS
 
 #MARK: - DNS Servers
-DNS_SERVERS = {
-    "Google": "8.8.8.8",
-    "Cloudflare": "1.1.1.1",
-    "Quad9": "9.9.9.9"
-}
+# Configured with DNSTOOLBOX_RESOLVERS or DNSTOOLBOX_RESOLVERS_FILE, see internal/dns/resolvers.py
+DNS_SERVERS = load_resolvers()
+
+# Upper bound for concurrent lookups issued by resolve_many
+MAX_CONCURRENT_QUERIES = 32
+
+TIMEOUT_ERROR = "Error: The DNS request timed out."
+NO_ANSWER_ERROR = "Error: No answer from the DNS server for the requested domain and record type."
+NXDOMAIN_ERROR = "Error: The requested domain does not exist."
+NO_NAMESERVERS_ERROR = "Error: No nameservers are available to fulfill the request."
 
 #MARK: - DNS Function
-def get_dns_record(domain, dns_server, type):
-    resolver = dns.resolver.Resolver()
-    resolver.nameservers = [dns_server]
+def get_dns_record(domain, dns_server, type, lifetime=None, transport="udp"):
+    return resolve_with_ttl(domain, dns_server, type, lifetime, transport)[0]
+
+def resolve_with_ttl(domain, dns_server, type, lifetime=None, transport="udp"):
+    """
+    Resolve a record through the shared answer cache.
+
+    Positive answers are cached for the lowest TTL in the answer section,
+    NXDOMAIN and NoAnswer results for the negative TTL of the zone's SOA record.
+
+    Returns:
+        tuple: (records, ttl) where records is the same list get_dns_record returns.
+    """
+    key = DNS_CACHE.make_key(domain, dns_server, type)
+    cached = DNS_CACHE.get(key)
+    if cached is not None:
+        if METRICS.enabled:
+            METRICS.record_dns_query(dns_server, type, "CACHED", 0.0, cache_hit=True)
+        return cached
+
+    records, ttl = query_dns_record(domain, dns_server, type, lifetime, transport)
+    DNS_CACHE.put(key, records, ttl)
+    return records, ttl
+
+def query_dns_record(domain, dns_server, type, lifetime=None, transport="udp"):
+    """
+    Send the query to the DNS server, bypassing the cache.
+
+    A transport in the DNS server ("tls://1.1.1.1") takes precedence over the
+    transport argument. UDP queries use the shared resolver of the DNS server,
+    "tcp" and "tls" queries are sent over a pooled persistent connection and
+    "https" queries over the kept-alive DNS-over-HTTPS client.
+    """
+    RATE_LIMITER.acquire(dns_server)
+    transport, nameserver = split_transport(dns_server, transport)
+    started = time.perf_counter()
+    retries = 0
     try:
-        answers = resolver.resolve(domain, type)
-        return [str(rdata) for rset in answers.response.answer for rdata in rset]
-    except dns.resolver.NoAnswer:
-        return ["Error: No answer from the DNS server for the requested domain and record type."]
-    except dns.resolver.NXDOMAIN:
-        return ["Error: The requested domain does not exist."]
-    except dns.resolver.NoNameservers:
-        return ["Error: No nameservers are available to fulfill the request."]
-    except dns.resolver.Timeout:
-        return ["Error: The DNS request timed out."]
\ No newline at end of file
+        if transport == "udp":
+            response = get_resolver(nameserver).resolve(domain, type, lifetime=lifetime).response
+        elif transport == "https":
+            response = resolve_over_https(domain, nameserver, type, lifetime)
+        else:
+            response = resolve_over_connection(domain, nameserver, type, transport, lifetime)
+        records = [str(rdata) for rset in response.answer for rdata in rset]
+        ttl, rcode = min(rset.ttl for rset in response.answer), "NOERROR"
+    except dns.resolver.NoAnswer as e:
+        records = [NO_ANSWER_ERROR]
+        ttl, rcode = negative_ttl(e.response()), "NODATA"
+    except dns.resolver.NXDOMAIN as e:
+        records = [NXDOMAIN_ERROR]
+        ttl, rcode = min((negative_ttl(response) for response in e.responses().values()), default=0), "NXDOMAIN"
+    except dns.resolver.NoNameservers as e:
+        records = [NO_NAMESERVERS_ERROR]
+        ttl, rcode, retries = 0, "SERVFAIL", max(0, len(e.kwargs.get("errors") or ()) - 1)
+    except dns.resolver.Timeout as e:
+        records = [TIMEOUT_ERROR]
+        ttl, rcode, retries = 0, "TIMEOUT", max(0, len(e.kwargs.get("errors") or ()) - 1)
+    duration = time.perf_counter() - started
+    LATENCY.observe(dns_server, duration, ok=rcode not in ("SERVFAIL", "TIMEOUT"))
+    if METRICS.enabled:
+        METRICS.record_dns_query(dns_server, type, rcode, duration, retries)
+    return records, ttl
+
+def is_valid_answer(records):
+    """Check if a result is an answer of the DNS server, including NXDOMAIN and NODATA, rather than a failure."""
+    return not (len(records) == 1 and records[0] in (TIMEOUT_ERROR, NO_NAMESERVERS_ERROR))
+
+def normalize_record(type, value):
+    """Normalize a record value for comparison, e.g. "Example.com." and "example.com" are the same."""
+    value = value.strip()
+    if type.upper() == "TXT":
+        # dnspython returns TXT strings quoted, long records split into several strings
+        return value.replace('" "', "").strip('"')
+    return value.lower().rstrip(".")
+
+def negative_ttl(response):
+    """Return the negative caching TTL (RFC 2308) from the SOA record in the authority section."""
+    for rset in response.authority:
+        if rset.rdtype == dns.rdatatype.SOA:
+            return min(rset.ttl, rset[0].minimum)
+    return 0
+
+#MARK: - Concurrent Lookups
+def timed_dns_record(domain, dns_server, type, lifetime=None):
+    """Return the records of get_dns_record together with the time the lookup took in seconds."""
+    started = time.perf_counter()
+    records = get_dns_record(domain, dns_server, type, lifetime)
+    return records, time.perf_counter() - started
+
+def resolve_many_timed(queries, deadline=None):
+    """
+    Resolve a batch of (domain, dns_server, type) queries concurrently.
+
+    Identical queries are only sent once. Queries that have not finished when the
+    deadline (in seconds) expires are reported as timed out.
+
+    Args:
+        queries (iterable): (domain, dns_server, type) tuples to resolve.
+        deadline (float): Overall time budget for the whole batch.
+
+    Returns:
+        dict: (records, latency) tuples keyed by query tuple. The latency is None for timed out queries.
+    """
+    unique_queries = list(dict.fromkeys(queries))
+    if not unique_queries:
+        return {}
+
+    executor = ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_QUERIES, len(unique_queries)))
+    try:
+        futures = {
+            executor.submit(timed_dns_record, domain, dns_server, type, deadline): (domain, dns_server, type)
+            for domain, dns_server, type in unique_queries
+        }
+        done, _ = wait(futures, timeout=deadline)
+        return {
+            query: future.result() if future in done else ([TIMEOUT_ERROR], None)
+            for future, query in futures.items()
+        }
+    finally:
+        # Don't block the caller on stragglers, their lifetime is bounded by the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def resolve_many(queries, deadline=None):
+    """Like resolve_many_timed, but only return the records of every query."""
+    return {query: records for query, (records, _) in resolve_many_timed(queries, deadline).items()}
@@ -0,0 +1,160 @@
+import threading
+import time
+
+# Hedge delay before any latency of a DNS server has been observed
+DEFAULT_HEDGE_DELAY = 0.2
+MIN_HEDGE_DELAY = 0.01
+MAX_HEDGE_DELAY = 0.5
+
+# A DNS server is degraded below this rolling success rate, and down after
+# this many failures in a row. A down server gets one probe query per PROBE_INTERVAL.
+DEGRADED_SUCCESS_RATE = 0.9
+DOWN_AFTER_FAILURES = 3
+PROBE_INTERVAL = 30.0
+
+#MARK: - Latency Tracker
+class LatencyTracker:
+    """
+    Rolling latency and health of every DNS server.
+
+    The latency is smoothed like TCP's retransmission timer (RFC 6298). The
+    hedge delay of a server is its smoothed latency plus four times the
+    latency variation, so a hedged query is only sent when the answer is
+    unusually late. After a failed query the other servers are asked right away
+    until the server answers again.
+
+    The success rate is a moving average over the recent queries. Together
+    with the latency it gives every server a score, the expected time to get
+    an answer, which is used to rank the servers and route around degraded ones.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, dns_server, latency, ok=True):
+        with self._lock:
+            stats = self._stats.get(dns_server)
+            if stats is None:
+                stats = self._stats[dns_server] = {
+                    "srtt": None, "rttvar": None, "success": 1.0, "samples": 0, "failures": 0, "last_failure": None,
+                }
+            stats["success"] = (1 - self.ALPHA) * stats["success"] + self.ALPHA * (1.0 if ok else 0.0)
+            if not ok:
+                stats["failures"] += 1
+                stats["last_failure"] = time.monotonic()
+                return
+            if stats["srtt"] is None:
+                stats["srtt"], stats["rttvar"] = latency, latency / 2
+            else:
+                stats["rttvar"] = (1 - self.BETA) * stats["rttvar"] + self.BETA * abs(stats["srtt"] - latency)
+                stats["srtt"] = (1 - self.ALPHA) * stats["srtt"] + self.ALPHA * latency
+            stats["samples"] += 1
+            stats["failures"] = 0
+
+    def hedge_delay(self, dns_server, alternatives=()):
+        """
+        Return how long to wait for the server before asking the alternatives, in seconds.
+
+        The others are asked right away if the server failed last time, or if
+        one of the alternatives is expected to answer before the server usually does.
+        """
+        with self._lock:
+            stats = self._stats.get(dns_server)
+            if stats is None:
+                return DEFAULT_HEDGE_DELAY
+            if stats["failures"]:
+                return 0.0
+            if any(self._timeout(self._stats.get(other)) < stats["srtt"] for other in alternatives):
+                return 0.0
+            return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, self._timeout(stats)))
+
+    @staticmethod
+    def _timeout(stats):
+        if stats is None or stats["srtt"] is None or stats["failures"]:
+            return float("inf")
+        return stats["srtt"] + 4 * stats["rttvar"]
+
+    #MARK: - Health
+    def health(self, dns_server):
+        """Return "unknown", "healthy", "degraded" or "down"."""
+        with self._lock:
+            return self._health(self._stats.get(dns_server))
+
+    def _health(self, stats):
+        if stats is None:
+            return "unknown"
+        if stats["failures"] >= DOWN_AFTER_FAILURES:
+            return "down"
+        if stats["success"] < DEGRADED_SUCCESS_RATE:
+            return "degraded"
+        return "healthy" if stats["srtt"] is not None else "unknown"
+
+    def score(self, dns_server):
+        """Return the expected time in seconds to get an answer from the server, lower is better."""
+        with self._lock:
+            return self._score(self._stats.get(dns_server))
+
+    def _score(self, stats):
+        if stats is None or stats["srtt"] is None:
+            return DEFAULT_HEDGE_DELAY
+        return stats["srtt"] / max(stats["success"], 0.05)
+
+    def is_available(self, dns_server):
+        """Check if queries may be routed to the server: it is not down, or its next probe is due."""
+        with self._lock:
+            stats = self._stats.get(dns_server)
+            return self._health(stats) != "down" or time.monotonic() - stats["last_failure"] >= PROBE_INTERVAL
+
+    def claim_probe(self, dns_server):
+        """
+        Claim the probe of a down server right before a query is sent to it.
+
+        Returns True for servers that are not down. For a down server whose
+        probe is due, this query becomes the probe and the other queries are
+        held back for another interval. Returns False if the probe is not due
+        or was claimed by another query.
+        """
+        with self._lock:
+            stats = self._stats.get(dns_server)
+            if self._health(stats) != "down":
+                return True
+            if time.monotonic() - stats["last_failure"] >= PROBE_INTERVAL:
+                stats["last_failure"] = time.monotonic()
+                return True
+            return False
+
+    def rank(self, dns_servers):
+        """Order the names of a {name: DNS server} dict from the best to the worst score, down servers last."""
+        with self._lock:
+            def key(name):
+                stats = self._stats.get(dns_servers[name])
+                return (self._health(stats) == "down", self._score(stats))
+            return sorted(dns_servers, key=key)
+
+    def snapshot(self):
+        """Return the current estimates as rows for display."""
+        with self._lock:
+            servers = [(dns_server, dict(stats)) for dns_server, stats in self._stats.items()]
+        return [
+            {
+                "resolver": dns_server,
+                "health": self.health(dns_server),
+                "latency_ms": stats["srtt"] * 1000 if stats["srtt"] is not None else None,
+                "variation_ms": stats["rttvar"] * 1000 if stats["rttvar"] is not None else None,
+                "success_rate": stats["success"],
+                "hedge_delay_ms": self.hedge_delay(dns_server) * 1000,
+                "samples": stats["samples"],
+                "failures": stats["failures"],
+            }
+            for dns_server, stats in servers
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+LATENCY = LatencyTracker()
@@ -0,0 +1,36 @@
+from internal.dns.dns import resolve_many_timed, DNS_SERVERS
+
+RECORD_TYPES = ["A", "AAAA", "CNAME", "MX", "NS", "TXT"]
+
+# Time budget in seconds for the whole matrix
+MATRIX_DEADLINE = 5.0
+
+#MARK: - Record Matrix
+def query_all_records(domain, record_types=RECORD_TYPES, dns_servers=None, deadline=MATRIX_DEADLINE):
+    """
+    Query every record type against every DNS server in one concurrent pass.
+
+    Args:
+        domain (str): The domain to query.
+        record_types (list): The record types to query.
+        dns_servers (dict): DNS server addresses by name, defaults to DNS_SERVERS.
+        deadline (float): Overall time budget in seconds.
+
+    Returns:
+        dict: {record_type: {dns_server_name: {"records": [...], "latency": seconds}}}.
+    """
+    dns_servers = dns_servers or DNS_SERVERS
+    answers = resolve_many_timed(
+        [(domain, dns_server, record_type) for record_type in record_types for dns_server in dns_servers.values()],
+        deadline=deadline,
+    )
+    matrix = {}
+    for record_type in record_types:
+        for dns_server_name, dns_server in dns_servers.items():
+            records, latency = answers[(domain, dns_server, record_type)]
+            matrix.setdefault(record_type, {})[dns_server_name] = {"records": records, "latency": latency}
+    return matrix
+
+def is_consistent(row):
+    """Check if all DNS servers returned the same records for one record type of the matrix."""
+    return len({tuple(sorted(cell["records"])) for cell in row.values()}) <= 1
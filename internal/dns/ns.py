@@ -1,5 +1,52 @@
 import streamlit as st
-from internal.dns.dns import get_dns_record, DNS_SERVERS
+from internal.dns.pool import get_dns_server_options, describe_dns_server, resolve_record
+from internal.dns.trace import TRACER
+from internal.cache import memoize, remember_check
+from internal.results import display_records
+
+# The delegation cache of the tracer is kept across traces, the rendered trace only for reruns of the page
+cached_trace = memoize("delegation_trace", ttl=60)(TRACER.trace)
+
+def display_delegation_trace(trace):
+    """
+    Display the delegation chain of a trace, with the response and timing of every nameserver.
+
+    Args:
+        trace (dict): A result of DelegationTracer.trace.
+    """
+    zones = [level["zone"] for level in trace["levels"]]
+    st.markdown(" → ".join(f"`{zone}`" for zone in zones))
+    if trace["from_cache"]:
+        st.caption(f"Started at the cached delegation of {trace['started_at']}, uncheck the cache option to trace from the root.")
+
+    for depth, level in enumerate(trace["levels"]):
+        problems = [server for server in level["servers"] if server["status"] != "ok"]
+        label = f"{'↳ ' if depth else ''}{level['zone']} ({len(level['servers'])} nameservers)"
+        with st.expander(label + (f" ⚠️ {len(problems)} with problems" if problems else ""), expanded=bool(problems)):
+            st.dataframe([
+                {
+                    "Nameserver": server["name"],
+                    "Address": server["address"],
+                    "Status": server["status"],
+                    "Response": server["kind"] if server["kind"] != "error" else server["rcode"] or server["error"],
+                    "Records": ", ".join(server["records"]),
+                    "Time (ms)": round(server["latency"] * 1000, 1) if server["latency"] is not None else None,
+                }
+                for server in level["servers"]
+            ], hide_index=True)
+
+    mismatch = trace["parent_child_mismatch"]
+    if mismatch:
+        st.warning(
+            "The parent and the child zone list different nameservers. "
+            f"Only at the parent: {', '.join(mismatch['parent_only']) or '-'}. "
+            f"Only at the child: {', '.join(mismatch['child_only']) or '-'}."
+        )
+    if trace["answer"]:
+        for i, record in enumerate(trace["answer"]):
+            st.info(f"Authoritative record {i+1}: {record}")
+    elif trace["rcode"] is None:
+        st.error("No nameserver of the last zone gave a usable answer.")
 
 #MARK: - DNS Functions - NS Record
 def get_ns_record():
@@ -11,12 +58,32 @@ def get_ns_record():
     """
     )
     domain = st.text_input("Domain", "example.com", key="a_record_domain")
-    dns_server = st.selectbox("DNS Server", list(DNS_SERVERS.keys()), key="a_record_dns_server", ) or DNS_SERVERS["Cloudflare"]
-    if st.button("Check", key="a_record_check"):
+    dns_server = st.selectbox("DNS Server", get_dns_server_options(), format_func=describe_dns_server, key="a_record_dns_server")
+    fastest = st.checkbox("Fastest answer", key="a_record_fastest", help="Also ask the other DNS servers if the chosen one is slow or fails.")
+    if remember_check("ns_record_checked", st.button("Check", key="a_record_check"), domain=domain):
         with st.spinner("Checking..."):
-            result = get_dns_record(domain or "", DNS_SERVERS.get(dns_server), "NS")
+            result, answered_by = resolve_record(domain or "", dns_server, "NS", hedge=fastest)
             if len(result) == 1 and result[0].startswith("Error:"):
                 st.error(result[0])
             else:
-                for i, record in enumerate(result):
-                    st.info(f"Record {i+1}: {record}")
+                if answered_by != dns_server:
+                    st.caption(f"Answered by {answered_by}.")
+                display_records(result, key="ns_record_results")
+
+    st.subheader("Delegation")
+    st.markdown(
+    """
+    Walk from the root servers down to the authoritative nameservers of the domain and ask every nameserver
+    on the way, to find lame delegations and nameservers with outdated records.
+    """
+    )
+    use_cache = st.checkbox(
+        "Start at cached delegations", True, key="ns_record_trace_cache",
+        help="Skip the levels above the parent zone, the parent is always asked to compare its delegation with the domain's own nameservers.",
+    )
+    if remember_check("ns_record_traced", st.button("Trace", key="ns_record_trace"), domain=domain, use_cache=use_cache):
+        with st.spinner("Tracing..."):
+            try:
+                display_delegation_trace(cached_trace(domain or ".", "NS", use_cache))
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
@@ -0,0 +1,44 @@
+from internal.dns.dns import DNS_SERVERS
+from internal.dns.latency import LATENCY
+from internal.dns.race import resolve_fastest
+
+# Option of the DNS server selection that routes to the best healthy resolver
+AUTOMATIC = "Automatic"
+
+#MARK: - Resolver Pool
+def get_dns_server_options():
+    """The DNS server choices of the record pages: automatic routing, then the configured resolvers."""
+    return [AUTOMATIC] + list(DNS_SERVERS.keys())
+
+def describe_dns_server(name):
+    """Label a DNS server choice with its transport and current health, e.g. "Quad9 (tls, 23 ms)"."""
+    if name == AUTOMATIC:
+        return f"{AUTOMATIC} (fastest healthy: {best_dns_server()})"
+    dns_server = DNS_SERVERS[name]
+    transport = dns_server.partition("://")[0] if "://" in dns_server else "udp"
+    health = LATENCY.health(dns_server)
+    if health in ("degraded", "down"):
+        return f"{name} ({transport}, {health})"
+    if health == "healthy":
+        return f"{name} ({transport}, {LATENCY.score(dns_server) * 1000:.0f} ms)"
+    return f"{name} ({transport})"
+
+def best_dns_server(dns_servers=None):
+    """Return the name of the best scoring DNS server that is not down."""
+    dns_servers = dns_servers or DNS_SERVERS
+    ranked = LATENCY.rank(dns_servers)
+    return next((name for name in ranked if LATENCY.is_available(dns_servers[name])), ranked[0])
+
+def resolve_record(domain, name, type, hedge=False, lifetime=None):
+    """
+    Resolve a record on a DNS server chosen by name, or on the best one for AUTOMATIC.
+
+    Automatic lookups are always hedged with the other healthy DNS servers.
+
+    Returns:
+        tuple: (records, name) with the records get_dns_record returns and the name of the DNS server that answered.
+    """
+    if name == AUTOMATIC:
+        name, hedge = best_dns_server(), True
+    records, answered_by = resolve_fastest(domain, DNS_SERVERS[name], type, hedge=hedge, lifetime=lifetime)
+    return records, next((other for other, dns_server in DNS_SERVERS.items() if dns_server == answered_by), answered_by)
@@ -0,0 +1,88 @@
+from datetime import datetime
+import streamlit as st
+from internal.dns.matrix import RECORD_TYPES
+from internal.dns.watch import get_watcher
+
+# How often the watch panel checks for new answers, in seconds
+REFRESH_INTERVAL = 2
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S") if timestamp else "-"
+
+def display_watch(watch):
+    """Display the state of every DNS server of a watch and the changes seen so far."""
+    resolvers, events = watch.snapshot()
+    converged = sum(state["converged"] for state in resolvers.values())
+    st.markdown(f"**{watch.type} {watch.domain}** expecting `{', '.join(watch.expected)}`: {watch.status}")
+    st.progress(converged / len(resolvers), text=f"{converged} of {len(resolvers)} DNS servers converged")
+    st.dataframe([
+        {
+            "DNS Server": name,
+            "Converged": state["converged"],
+            "Records": ", ".join(state["records"] or []) if state["error"] is None else state["error"],
+            "Checked": format_time(state["checked_at"]),
+            "Next Check": format_time(state["next_check"]),
+            "Polls": state["polls"],
+        }
+        for name, state in resolvers.items()
+    ], hide_index=True)
+    if events:
+        # One element for all changes, so a refresh doesn't send an element per event
+        lines = []
+        for event in reversed(events):
+            if event.get("converged"):
+                lines.append(f"{format_time(event['time'])} {event['resolver']}: converged")
+            else:
+                changes = [f"+{value}" for value in event["added"]] + [f"-{value}" for value in event["removed"]]
+                lines.append(f"{format_time(event['time'])} {event['resolver']}: {', '.join(changes) or 'no records'}")
+        with st.expander(f"Changes ({len(events)})"):
+            st.text("\n".join(lines))
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def display_watches():
+    """
+    Show the watches of this session.
+
+    Only this fragment reruns on the refresh interval, it reads the state the
+    watcher keeps in memory and sends no queries itself.
+    """
+    watcher = get_watcher()
+    watches = [watcher.get(watch_id) for watch_id in st.session_state.get("propagation_watch_ids", [])]
+    watches = [watch for watch in watches if watch is not None]
+    if not watches:
+        st.info("No propagation watches yet.")
+        return
+    for watch in watches:
+        with st.container(border=True):
+            display_watch(watch)
+            if st.button("Remove", key=f"propagation_watch_remove_{watch.id}"):
+                watcher.remove(watch.id)
+                st.session_state["propagation_watch_ids"].remove(watch.id)
+                st.rerun(scope="fragment")
+
+#MARK: - DNS Functions - Propagation Watch
+def invoke_propagation_watch():
+    st.write("# Propagation Watch")
+    st.markdown(
+    """
+    After a DNS change, watch a record until every DNS server returns the expected value.
+    Each DNS server is asked again when the TTL of its last answer runs out, and the page updates as soon as
+    one of them sees the change.
+    """
+    )
+    domain = st.text_input("Domain", "example.com", key="a_record_domain")
+    record_type = st.selectbox("Record Type", RECORD_TYPES, key="propagation_watch_type")
+    expected = st.text_area("Expected values, one per line", key="propagation_watch_expected")
+    if st.button("Watch", key="propagation_watch_start"):
+        values = [line for line in (expected or "").splitlines() if line.strip()]
+        if not domain or not values:
+            st.error("Enter a domain and at least one expected value.")
+        else:
+            try:
+                watch = get_watcher().add(domain, record_type, values)
+                st.session_state.setdefault("propagation_watch_ids", []).append(watch.id)
+            except RuntimeError as e:
+                st.error(f"Error: {str(e)}")
+
+    st.divider()
+    display_watches()
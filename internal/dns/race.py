@@ -0,0 +1,97 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from internal.dns.client import DEFAULT_TIMEOUT
+from internal.dns.dns import get_dns_record, is_valid_answer, resolve_many, DNS_SERVERS, TIMEOUT_ERROR
+from internal.dns.latency import LATENCY
+from internal.metrics import METRICS
+
+#MARK: - Fastest Answer
+def resolve_fastest(domain, dns_server, type, hedge=True, dns_servers=None, lifetime=None):
+    """
+    Resolve a record on the chosen DNS server, hedged by the other DNS servers.
+
+    If the chosen server has not answered after its hedge delay (see
+    LatencyTracker.hedge_delay), or failed, the same query is sent to all other servers
+    and the first valid answer wins. NXDOMAIN and NODATA count as answers,
+    timeouts and SERVFAIL don't. Hedged queries that have not started yet
+    are cancelled, running ones are abandoned and end with their lifetime.
+
+    Args:
+        domain (str): The domain to query.
+        dns_server (str): The preferred DNS server address.
+        type (str): The record type.
+        hedge (bool): Set to False to only ask the chosen server.
+        dns_servers (dict): DNS server addresses by name to hedge with, defaults to DNS_SERVERS.
+        lifetime (float): Time budget in seconds for the whole race.
+
+    Returns:
+        tuple: (records, dns_server) with the records get_dns_record returns and the address of the server that answered.
+    """
+    if not hedge:
+        return get_dns_record(domain, dns_server, type, lifetime), dns_server
+
+    # Hedge with the best scoring DNS servers first and leave out the ones that are down
+    dns_servers = dns_servers or DNS_SERVERS
+    others = [dns_servers[name] for name in LATENCY.rank(dns_servers) if dns_servers[name] != dns_server]
+    others = [other for other in dict.fromkeys(others) if LATENCY.is_available(other)]
+    lifetime = lifetime or DEFAULT_TIMEOUT
+    started = time.monotonic()
+    hedge_at = started + LATENCY.hedge_delay(dns_server, others)
+    deadline = started + lifetime
+
+    executor = ThreadPoolExecutor(max_workers=1 + len(others))
+    try:
+        # The chosen server is asked in any case, if it is down this query is its probe
+        LATENCY.claim_probe(dns_server)
+        futures = {executor.submit(get_dns_record, domain, dns_server, type, lifetime): dns_server}
+        pending = set(futures)
+        hedged = not others
+        failure = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            done, pending = wait(pending, timeout=(deadline if hedged else hedge_at) - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                records = future.result()
+                if is_valid_answer(records):
+                    if METRICS.enabled:
+                        METRICS.increment("dnstoolbox_dns_race_wins_total", resolver=futures[future], hedged=str(hedged).lower())
+                    return records, futures[future]
+                failure = failure or records
+            if not hedged and (done or time.monotonic() >= hedge_at):
+                # The chosen server is slow or failed, ask the others
+                remaining = max(0.0, deadline - time.monotonic())
+                for other in others:
+                    # Down servers are only asked if this query gets to be their probe
+                    if not LATENCY.claim_probe(other):
+                        continue
+                    future = executor.submit(get_dns_record, domain, other, type, remaining)
+                    futures[future] = other
+                    pending.add(future)
+                hedged = True
+        return failure or [TIMEOUT_ERROR], dns_server
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+#MARK: - Consensus
+def resolve_consensus(questions, dns_servers=None, deadline=None):
+    """
+    Ask every DNS server every (domain, type) question and wait for all answers.
+
+    All queries run in one concurrent batch, unanswered queries are reported
+    as timed out when the deadline expires.
+
+    Returns:
+        dict: {(domain, type): {dns_server_name: records}}.
+    """
+    dns_servers = dns_servers or DNS_SERVERS
+    questions = list(dict.fromkeys(questions))
+    answers = resolve_many(
+        [(domain, dns_server, type) for domain, type in questions for dns_server in dns_servers.values()],
+        deadline=deadline,
+    )
+    return {
+        (domain, type): {name: answers[(domain, dns_server, type)] for name, dns_server in dns_servers.items()}
+        for domain, type in questions
+    }
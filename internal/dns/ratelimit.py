@@ -0,0 +1,48 @@
+import threading
+import time
+
+#MARK: - Rate Limiter
+class ResolverRateLimiter:
+    """
+    Token bucket limiting how many queries per second are sent to each nameserver.
+
+    Nameservers without a configured limit are not throttled.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def set_limit(self, nameserver, rate, burst=None):
+        """Allow `rate` queries per second to the nameserver, with bursts of up to `burst` queries."""
+        with self._lock:
+            if not rate:
+                self._buckets.pop(nameserver, None)
+                return
+            burst = burst or max(1.0, rate)
+            self._buckets[nameserver] = [rate, burst, burst, time.monotonic()]
+
+    def get_limit(self, nameserver):
+        """Return the (rate, burst) configured for the nameserver, or None if it isn't throttled."""
+        with self._lock:
+            bucket = self._buckets.get(nameserver)
+            return None if bucket is None else tuple(bucket[:2])
+
+    def acquire(self, nameserver):
+        """Block until a query to the nameserver is allowed."""
+        while True:
+            with self._lock:
+                bucket = self._buckets.get(nameserver)
+                if bucket is None:
+                    return
+                rate, burst, tokens, updated = bucket
+                now = time.monotonic()
+                tokens = min(burst, tokens + (now - updated) * rate)
+                if tokens >= 1:
+                    bucket[2:] = [tokens - 1, now]
+                    return
+                bucket[2:] = [tokens, now]
+                wait = (1 - tokens) / rate
+            time.sleep(wait)
+
+RATE_LIMITER = ResolverRateLimiter()
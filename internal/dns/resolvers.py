@@ -0,0 +1,66 @@
+import os
+from internal.dns.client import split_nameserver, split_transport
+
+DEFAULT_RESOLVERS = {
+    "Google": "8.8.8.8",
+    "Cloudflare": "1.1.1.1",
+    "Quad9": "9.9.9.9",
+}
+
+#MARK: - Configuration
+def parse_resolvers(text):
+    """
+    Parse a resolver list, one "name = DNS server" per line.
+
+    Entries are only separated by line breaks, DNS-over-HTTPS URLs may contain
+    commas in their query string.
+
+    The DNS server is an address with an optional port for plain UDP, or
+    carries its transport as a scheme. Lines starting with "#" are comments:
+
+        Google = 8.8.8.8
+        Internal = 10.0.0.53:5353
+        Cloudflare DoT = tls://1.1.1.1
+        Quad9 DoH = https://dns.quad9.net/dns-query
+
+    Returns:
+        dict: DNS servers by name, in the configured order.
+
+    Raises:
+        ValueError: If an entry is malformed or a name is used twice.
+    """
+    resolvers = {}
+    for entry in text.splitlines():
+        entry = entry.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        name, separator, dns_server = (part.strip() for part in entry.partition("="))
+        if not separator or not name or not dns_server:
+            raise ValueError(f"Invalid resolver {entry!r}, expected \"name = DNS server\"")
+        if name in resolvers:
+            raise ValueError(f"Resolver {name!r} is configured twice")
+        transport, nameserver = split_transport(dns_server)
+        if transport != "https":
+            try:
+                split_nameserver(nameserver)
+            except ValueError:
+                raise ValueError(f"Invalid port in resolver {entry!r}")
+        resolvers[name] = dns_server
+    if not resolvers:
+        raise ValueError("No resolvers configured")
+    return resolvers
+
+def load_resolvers(environ=os.environ):
+    """
+    Load the resolvers from DNSTOOLBOX_RESOLVERS_FILE or DNSTOOLBOX_RESOLVERS.
+
+    The file takes precedence over the variable. Without either, the
+    DEFAULT_RESOLVERS are used.
+    """
+    path = environ.get("DNSTOOLBOX_RESOLVERS_FILE")
+    if path:
+        with open(path) as f:
+            return parse_resolvers(f.read())
+    if environ.get("DNSTOOLBOX_RESOLVERS"):
+        return parse_resolvers(environ["DNSTOOLBOX_RESOLVERS"])
+    return dict(DEFAULT_RESOLVERS)
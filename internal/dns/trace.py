@@ -0,0 +1,307 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import dns.exception
+import dns.flags
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdatatype
+from internal.dns.client import split_nameserver, join_nameserver
+from internal.metrics import METRICS
+
+ROOT_SERVERS = {
+    "a.root-servers.net.": "198.41.0.4",
+    "b.root-servers.net.": "170.247.170.2",
+    "c.root-servers.net.": "192.33.4.12",
+    "d.root-servers.net.": "199.7.91.13",
+    "e.root-servers.net.": "192.203.230.10",
+    "f.root-servers.net.": "192.5.5.241",
+    "g.root-servers.net.": "192.112.36.4",
+    "h.root-servers.net.": "198.97.190.53",
+    "i.root-servers.net.": "192.36.148.17",
+    "j.root-servers.net.": "192.58.128.30",
+    "k.root-servers.net.": "193.0.14.129",
+    "l.root-servers.net.": "199.7.83.42",
+    "m.root-servers.net.": "202.12.27.33",
+}
+
+# Timeout of a single query to an authoritative server in seconds
+QUERY_TIMEOUT = 2.0
+# Limits against delegation loops and deep chains of nameservers without glue
+MAX_REFERRALS = 16
+MAX_GLUE_DEPTH = 3
+# Upper bound for the queries sent in parallel at one level
+MAX_PARALLEL_QUERIES = 32
+# Cached delegations and glue expire with their TTL, but are kept at most this long
+MAX_CACHE_TTL = 3600
+
+#MARK: - Authoritative Queries
+def query_authoritative(domain, type, nameserver, timeout=QUERY_TIMEOUT):
+    """
+    Send a non-recursive query to a nameserver, retrying over TCP if the answer is truncated.
+
+    Returns:
+        tuple: (response, latency, error) where response is None if the query failed.
+    """
+    address, port = split_nameserver(nameserver)
+    query = dns.message.make_query(domain, type)
+    query.flags &= ~dns.flags.RD
+    started = time.perf_counter()
+    try:
+        response = dns.query.udp(query, address, timeout=timeout, port=port)
+        if response.flags & dns.flags.TC:
+            response = dns.query.tcp(query, address, timeout=timeout, port=port)
+        return response, time.perf_counter() - started, None
+    except dns.exception.Timeout:
+        return None, time.perf_counter() - started, "timeout"
+    except (OSError, dns.exception.DNSException) as e:
+        return None, time.perf_counter() - started, str(e) or e.__class__.__name__
+
+def classify_response(response, domain, type, zone):
+    """
+    Describe the response of a nameserver that is supposed to serve zone.
+
+    Returns:
+        dict: "kind" is "answer", "referral", "nxdomain", "nodata" or "error",
+        "records" the answer or the delegated nameservers, "child" the
+        delegated zone of a referral and "lame" whether the server does not
+        act as an authoritative server of the zone.
+    """
+    rcode = dns.rcode.to_text(response.rcode())
+    authoritative = bool(response.flags & dns.flags.AA)
+    result = {"rcode": rcode, "kind": "error", "records": [], "child": None, "lame": True}
+    if response.rcode() not in (dns.rcode.NOERROR, dns.rcode.NXDOMAIN):
+        return result
+    if response.rcode() == dns.rcode.NXDOMAIN:
+        result.update(kind="nxdomain", lame=not authoritative)
+        return result
+
+    answers = [rset for rset in response.answer if rset.name == domain]
+    if answers:
+        result.update(kind="answer", records=sorted(str(rdata) for rset in answers for rdata in rset), lame=not authoritative)
+        return result
+
+    for rset in response.authority:
+        if rset.rdtype == dns.rdatatype.NS and domain.is_subdomain(rset.name):
+            # A referral must point further down the tree, anything else is a lame or broken server
+            downward = rset.name.is_subdomain(zone) and rset.name != zone
+            result.update(kind="referral", records=sorted(str(rdata.target) for rdata in rset),
+                          child=rset.name.to_text(), lame=not downward, ttl=rset.ttl)
+            return result
+
+    result.update(kind="nodata", lame=not authoritative)
+    return result
+
+def extract_glue(response, ipv6=False):
+    """Return the glue addresses of a referral as {nameserver name: ([addresses], ttl)}."""
+    types = (dns.rdatatype.A, dns.rdatatype.AAAA) if ipv6 else (dns.rdatatype.A,)
+    glue = {}
+    for rset in response.additional:
+        if rset.rdtype in types:
+            addresses, ttl = glue.get(rset.name.to_text(), ([], rset.ttl))
+            glue[rset.name.to_text()] = (addresses + [rdata.address for rdata in rset], min(ttl, rset.ttl))
+    return glue
+
+#MARK: - Delegation Tracer
+class DelegationTracer:
+    """
+    Iterative resolver that records every step from the root to the zone of a name.
+
+    At every level all nameservers of the zone are queried in parallel, so
+    lame servers and servers with stale data show up next to the others.
+    Delegations and glue addresses are cached with their TTL and shared by
+    all traces.
+
+    Args:
+        root_servers (dict): Root server addresses by name, "address" or "address:port".
+        port (int): Port of the nameservers found in referrals.
+        timeout (float): Timeout of a single query in seconds.
+        ipv6 (bool): Also query the IPv6 addresses of nameservers.
+    """
+
+    def __init__(self, root_servers=ROOT_SERVERS, port=53, timeout=QUERY_TIMEOUT, ipv6=False):
+        self.root_servers = root_servers
+        self.port = port
+        self.timeout = timeout
+        self.ipv6 = ipv6
+        self._delegations = {}
+        self._addresses = {}
+        self._lock = threading.Lock()
+
+    #MARK: - Cache
+    def _cache_get(self, cache, key):
+        with self._lock:
+            entry = cache.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                cache.pop(key, None)
+                return None
+            return entry[1]
+
+    def _cache_put(self, cache, key, value, ttl):
+        with self._lock:
+            cache[key] = (time.monotonic() + min(ttl, MAX_CACHE_TTL), value)
+
+    def cached_delegation(self, domain):
+        """Return the deepest cached (zone, nameservers) enclosing domain, or None."""
+        name = dns.name.from_text(domain)
+        while True:
+            nameservers = self._cache_get(self._delegations, name.to_text())
+            if nameservers is not None:
+                return name.to_text(), nameservers
+            if name == dns.name.root:
+                return None
+            name = name.parent()
+
+    def clear(self):
+        with self._lock:
+            self._delegations.clear()
+            self._addresses.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"delegations": len(self._delegations), "addresses": len(self._addresses)}
+
+    #MARK: - Trace
+    def trace(self, domain, type="NS", use_cache=True, depth=0):
+        """
+        Walk the delegation chain of domain and query the record at its authoritative servers.
+
+        Args:
+            domain (str): The name to trace.
+            type (str): The record type asked at every level.
+            use_cache (bool): Start at the deepest cached delegation instead of the root.
+                NS traces start above the domain, so the parent's referral is
+                always asked again and compared with the child's answer.
+
+        Returns:
+            dict: "levels" with one entry per zone on the way, each with the
+            responses of all its nameservers, plus the final "answer" and
+            "rcode" agreed on by the majority of the last level, and for NS
+            traces the nameservers by which parent and child disagree.
+        """
+        started = time.perf_counter()
+        qname = dns.name.from_text(domain)
+        cached = None
+        if use_cache:
+            # The delegation of domain itself would skip its parent and with it the parent/child comparison
+            start = qname.parent() if type.upper() == "NS" and qname != dns.name.root else qname
+            cached = self.cached_delegation(start.to_text())
+        if cached:
+            zone, nameservers = cached
+        else:
+            zone, nameservers = ".", {name: [address] for name, address in self.root_servers.items()}
+
+        result = {
+            "domain": qname.to_text(), "type": type.upper(), "started_at": zone, "from_cache": bool(cached),
+            "levels": [], "answer": None, "rcode": None, "parent_child_mismatch": None,
+        }
+        for _ in range(MAX_REFERRALS):
+            level, glue, ttl = self._query_level(qname, type, zone, nameservers)
+            result["levels"].append(level)
+            majority = level["majority"]
+            if majority is None or majority["kind"] != "referral":
+                if majority is not None:
+                    result["rcode"] = majority["rcode"]
+                    result["answer"] = majority["records"] if majority["kind"] == "answer" else []
+                break
+            zone, nameservers = majority["child"], self._nameservers_of(majority, glue, ttl, depth)
+            if not any(nameservers.values()):
+                break
+
+        if result["type"] == "NS" and result["answer"] and len(result["levels"]) > 1:
+            parent = set(result["levels"][-2]["majority"]["records"])
+            child = set(result["answer"])
+            if parent != child:
+                result["parent_child_mismatch"] = {"parent_only": sorted(parent - child), "child_only": sorted(child - parent)}
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+    def _query_level(self, qname, type, zone, nameservers):
+        """Ask every address of every nameserver of zone, all in parallel."""
+        targets = [(name, address) for name, addresses in nameservers.items() for address in addresses]
+        servers = []
+        responses = []
+        if targets:
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_QUERIES, len(targets))) as executor:
+                responses = list(executor.map(lambda target: query_authoritative(qname, type, target[1], self.timeout), targets))
+
+        zone_name = dns.name.from_text(zone)
+        for (name, address), (response, latency, error) in zip(targets, responses):
+            server = {"name": name, "address": address, "latency": latency, "error": error}
+            if response is None:
+                server.update(rcode=None, kind="error", records=[], child=None, lame=True, status="timeout" if error == "timeout" else "error")
+            else:
+                server.update(classify_response(response, qname, type, zone_name))
+                server["status"] = "lame" if server["lame"] else "ok"
+                if server["kind"] == "referral":
+                    server["_glue"] = extract_glue(response, self.ipv6)
+            if METRICS.enabled:
+                METRICS.observe("dnstoolbox_dns_trace_query_duration_seconds", latency, zone=zone, status=server["status"])
+            servers.append(server)
+        for name in nameservers:
+            if not nameservers[name]:
+                servers.append({"name": name, "address": None, "latency": None, "error": "no address", "rcode": None,
+                                "kind": "error", "records": [], "child": None, "lame": True, "status": "error"})
+
+        # Compare every server with the most common response of the servers that answered properly
+        def signature(server):
+            return (server["kind"], server["child"], tuple(server["records"]), server["rcode"])
+        answered = [server for server in servers if server["status"] == "ok"]
+        counts = Counter(signature(server) for server in answered)
+        majority = None
+        if counts:
+            majority_signature = counts.most_common(1)[0][0]
+            majority = next(server for server in answered if signature(server) == majority_signature)
+            for server in answered:
+                if signature(server) != majority_signature:
+                    server["status"] = "mismatch"
+
+        # Merge the glue of all servers that agree on the referral, the lowest TTL wins
+        glue = {}
+        referral_ttl = MAX_CACHE_TTL
+        for server in servers:
+            server_glue = server.pop("_glue", {})
+            if majority is not None and server["kind"] == "referral" and server["child"] == majority["child"]:
+                referral_ttl = min(referral_ttl, server["ttl"])
+                for name, (addresses, ttl) in server_glue.items():
+                    known, known_ttl = glue.get(name, (set(), ttl))
+                    glue[name] = (known | set(addresses), min(known_ttl, ttl))
+
+        level = {
+            "zone": zone,
+            "servers": servers,
+            "majority": {key: majority[key] for key in ("kind", "rcode", "records", "child")} if majority else None,
+            "consistent": all(server["status"] == "ok" for server in servers),
+        }
+        return level, glue, referral_ttl
+
+    def _nameservers_of(self, majority, glue, ttl, depth):
+        """Collect the addresses of the delegated nameservers from glue, the cache or by resolving them."""
+        nameservers = {}
+        for name in majority["records"]:
+            if name in glue:
+                addresses = sorted(glue[name][0])
+                self._cache_put(self._addresses, name, addresses, glue[name][1])
+            else:
+                addresses = self._cache_get(self._addresses, name)
+                if addresses is None and depth < MAX_GLUE_DEPTH:
+                    addresses = self._resolve_address(name, depth + 1)
+            nameservers[name] = [join_nameserver(address, self.port) for address in addresses or []]
+        if any(nameservers.values()):
+            self._cache_put(self._delegations, majority["child"], nameservers, ttl)
+        return nameservers
+
+    def _resolve_address(self, name, depth):
+        """Resolve a nameserver without glue with a nested trace."""
+        addresses = []
+        for type in ("A", "AAAA") if self.ipv6 else ("A",):
+            trace = self.trace(name, type, depth=depth)
+            addresses += [record for record in trace["answer"] or [] if not record.endswith(".")]
+        if addresses:
+            self._cache_put(self._addresses, name, addresses, MAX_CACHE_TTL)
+        return addresses
+
+TRACER = DelegationTracer()
@@ -0,0 +1,215 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from internal.dns.dns import query_dns_record, is_valid_answer, normalize_record, DNS_SERVERS
+
+logger = logging.getLogger(__name__)
+
+# Resolvers are polled again when the TTL of their last answer expires, within these bounds in seconds
+MIN_POLL_INTERVAL = 5
+MAX_POLL_INTERVAL = 300
+QUERY_LIFETIME = 5.0
+# Queries of all watches in flight at the same time, which bounds the sockets and threads used
+MAX_IN_FLIGHT = 16
+# Watches stop polling after WATCH_LIFETIME and are dropped RETENTION seconds after they finished
+WATCH_LIFETIME = 24 * 3600
+RETENTION = 3600
+MAX_WATCHES = 1000
+# Changes kept per watch for display
+MAX_EVENTS = 200
+
+#MARK: - Watch
+class PropagationWatch:
+    """
+    The propagation state of one record across a set of DNS servers.
+
+    Every answer is compared with the previous answer of the same DNS server
+    and only the differences are recorded as events. A DNS server has
+    converged once its answer contains all expected values, it is not polled
+    anymore after that.
+    """
+
+    def __init__(self, watch_id, domain, type, expected, dns_servers, lifetime=WATCH_LIFETIME):
+        self.id = watch_id
+        self.domain = domain
+        self.type = type.upper()
+        self.expected = sorted({normalize_record(type, value) for value in expected if value.strip()})
+        self.dns_servers = dict(dns_servers)
+        self.created = time.time()
+        self.expires = self.created + lifetime
+        self.finished = None
+        self.events = []
+        self.resolvers = {
+            name: {
+                "records": None, "error": None, "converged": False, "checked_at": None,
+                "next_check": self.created, "converged_at": None, "polls": 0, "failures": 0,
+            }
+            for name in self.dns_servers
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        if all(state["converged"] for state in self.resolvers.values()):
+            return "converged"
+        if self.finished:
+            return "stopped" if self.finished < self.expires else "expired"
+        return "watching"
+
+    def snapshot(self):
+        """Return a consistent copy of (resolvers, events) for display."""
+        with self._lock:
+            return {name: dict(state) for name, state in self.resolvers.items()}, list(self.events)
+
+    def update(self, name, records, ttl, now=None):
+        """
+        Record the answer of a DNS server.
+
+        Returns:
+            float: When to poll the DNS server next, None if it should not be polled again.
+        """
+        now = now or time.time()
+        with self._lock:
+            state = self.resolvers[name]
+            state["polls"] += 1
+            state["checked_at"] = now
+            if not is_valid_answer(records):
+                state["failures"] += 1
+                state["error"] = records[0]
+                next_check = now + min(MAX_POLL_INTERVAL, MIN_POLL_INTERVAL * 2 ** state["failures"])
+            else:
+                state["failures"] = 0
+                state["error"] = None
+                # NXDOMAIN and NODATA are answers without records
+                current = [] if records[0].startswith("Error:") else sorted(normalize_record(self.type, record) for record in records)
+                previous = state["records"]
+                if current != previous:
+                    self._add_event({
+                        "time": now, "resolver": name,
+                        "added": sorted(set(current) - set(previous or [])),
+                        "removed": sorted(set(previous or []) - set(current)),
+                    })
+                    state["records"] = current
+                if set(self.expected) <= set(current):
+                    state["converged"] = True
+                    state["converged_at"] = now
+                    self._add_event({"time": now, "resolver": name, "converged": True})
+                next_check = now + min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, ttl + 1))
+
+            if state["converged"] or now >= self.expires or self.finished:
+                next_check = None
+            state["next_check"] = next_check
+            if all(state["next_check"] is None for state in self.resolvers.values()):
+                self.finished = self.finished or now
+            return next_check
+
+    def stop(self):
+        with self._lock:
+            self.finished = self.finished or time.time()
+            for state in self.resolvers.values():
+                state["next_check"] = None
+
+    def _add_event(self, event):
+        self.events.append(event)
+        del self.events[:-MAX_EVENTS]
+
+#MARK: - Scheduler
+class PropagationWatcher:
+    """
+    Polls the DNS servers of all watches from one scheduler thread.
+
+    Due polls are kept in a single heap and handed to a fixed pool of
+    MAX_IN_FLIGHT workers. When all workers are busy the scheduler waits,
+    so hundreds of watches never use more sockets or threads than that.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        self._watches = {}
+        self._queue = []
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="propagation-watch")
+        self._thread = threading.Thread(target=self._run, name="propagation-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def add(self, domain, type, expected, dns_servers=None, lifetime=WATCH_LIFETIME):
+        """Start watching a record and return the new PropagationWatch."""
+        with self._condition:
+            self._expire(time.time())
+            if len(self._watches) >= MAX_WATCHES:
+                raise RuntimeError(f"Too many propagation watches, at most {MAX_WATCHES} can run at the same time.")
+            watch = PropagationWatch(next(self._ids), domain, type, expected, dns_servers or DNS_SERVERS, lifetime)
+            self._watches[watch.id] = watch
+            for name in watch.dns_servers:
+                self._schedule(watch.created, watch, name)
+            self._condition.notify()
+        return watch
+
+    def get(self, watch_id):
+        return self._watches.get(watch_id)
+
+    def remove(self, watch_id):
+        with self._condition:
+            watch = self._watches.pop(watch_id, None)
+        if watch:
+            watch.stop()
+
+    def count(self):
+        return len(self._watches)
+
+    def _schedule(self, when, watch, name):
+        heapq.heappush(self._queue, (when, next(self._sequence), watch, name))
+
+    def _expire(self, now):
+        for watch_id, watch in list(self._watches.items()):
+            if watch.finished and watch.finished + RETENTION < now:
+                del self._watches[watch_id]
+
+    def _run(self):
+        while True:
+            self._slots.acquire()
+            with self._condition:
+                while not self._queue or self._queue[0][0] > time.time():
+                    self._condition.wait(self._queue[0][0] - time.time() if self._queue else None)
+                _, _, watch, name = heapq.heappop(self._queue)
+            if watch.finished or self._watches.get(watch.id) is not watch:
+                self._slots.release()
+                continue
+            try:
+                self._executor.submit(self._poll, watch, name)
+            except RuntimeError:
+                # The interpreter is shutting down
+                return
+
+    def _poll(self, watch, name):
+        try:
+            records, ttl = query_dns_record(watch.domain, watch.dns_servers[name], watch.type, QUERY_LIFETIME)
+            next_check = watch.update(name, records, ttl)
+        except Exception:
+            logger.exception("Propagation poll of %s on %s failed", watch.domain, name)
+            next_check = time.time() + MAX_POLL_INTERVAL
+        finally:
+            self._slots.release()
+        if next_check is not None:
+            with self._condition:
+                self._schedule(next_check, watch, name)
+                self._condition.notify()
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def get_watcher():
+    """Return the process-wide watcher, starting it on first use."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = PropagationWatcher()
+            _watcher.start()
+    return _watcher
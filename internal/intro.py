@@ -13,6 +13,7 @@ def get_intro():
     ### Features
 
     - **M365 Check**: For a broad overview if you are using Microsoft 365.
+    - **Mail Security**: Analyzes SPF (with the whole include tree), DMARC, DKIM, MTA-STS and TLS-RPT of a domain.
     - **SSL Check**: Helps you check the SSL certificate of a webpage.
 
     ### Explanation of DNS Records
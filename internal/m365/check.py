@@ -1,11 +1,11 @@
 import streamlit as st
-from collections import defaultdict
-from internal.dns.dns import get_dns_record, DNS_SERVERS
+from internal.cache import memoize, remember_check
+from internal.m365.core import fetch_m365_answers, select_m365_results, is_complete_answers, get_record_status, find_discrepancies, RECORD_CHECKS
 
 DESCRIPTION = """
 An M365 check is a test that checks the validity of the M365 configuration of a domain.
 With this demo you can check the M365 configuration of a domain.
-This will check the following DNS-Records on all 3 DNS-Servers (Google, Cloudflare, Quad9):
+This will check the following DNS-Records on all configured DNS-Servers:
 - MX Record for *.mail.protection.outlook.com
 - TXT Record containing spf.protection.outlook.com
 - TXT Record containing v=verifydomain MS=*
@@ -16,21 +16,9 @@ This will check the following DNS-Records on all 3 DNS-Servers (Google, Cloudfla
     - selector2._domainkey
 """
 
-def check_mx_record(domain, dns_server):
-    """Check if the MX record for the domain is valid on the given DNS server."""
-    return get_dns_record(domain, dns_server, "MX")
-
-def check_spf_record(domain, dns_server):
-    """Check if the SPF record for the domain exists on the given DNS server."""
-    return next((record for record in get_dns_record(domain, dns_server, "TXT") if "spf.protection.outlook.com" in record), None)
-
-def check_verify_domain_record(domain, dns_server):
-    """Check if the Microsoft Domain Verification record for the domain exists on the given DNS server."""
-    return next((record for record in get_dns_record(domain, dns_server, "TXT") if "v=verifydomain MS=" in record), None)
-
-def check_cname_record(record_name, domain, dns_server):
-    """Check if the CNAME record for the given record name exists on the given DNS server."""
-    return get_dns_record(f"{record_name}.{domain}", dns_server, "CNAME")
+# Page results are kept for a few minutes so reruns don't repeat the lookups.
+# Answers with timeouts or server failures are not kept, so a retry asks again.
+cached_fetch_m365_answers = memoize("m365_check", ttl=300, cache_if=is_complete_answers)(fetch_m365_answers)
 
 def display_detailed_results(dns_results, domain):
     """Display detailed results for each DNS server."""
@@ -56,45 +44,18 @@ def display_detailed_results(dns_results, domain):
 
 def check_record_status(dns_results, record_type):
     """Check the status of a specific DNS record type across all DNS servers."""
-    record_status = [dns_results[dns_server_name][record_type] for dns_server_name in DNS_SERVERS.keys()]
+    status = get_record_status(dns_results, record_type)
     
-    if all(record_status):
+    if status == "verified":
         st.success(f"{record_type} record verified.")
-    elif any(record_status):
+    elif status == "partial":
         st.warning(f"{record_type} record doesn't seem to be available worldwide.")
     else:
         st.error(f"{record_type} record not found on any DNS server.")
 
 def check_discrepancies(dns_results, record_checks):
     """Check for discrepancies in DNS records across all DNS servers."""
-    discrepancies = {}
-    
-    for record_type in record_checks.keys():
-        record_values = {}
-        unique_values = set()
-
-        for dns_server_name in DNS_SERVERS.keys():
-            record_value = dns_results[dns_server_name][record_type]
-            # Handle None values by converting them to an empty tuple
-            if record_value is None:
-                record_value = ()
-            elif isinstance(record_value, list):
-                # Convert lists to tuples
-                record_value = tuple(record_value)
-            elif isinstance(record_value, str):
-                # Keep strings as single-element tuples
-                record_value = (record_value,)
-
-            if record_value not in record_values:
-                record_values[record_value] = [dns_server_name]
-            else:
-                record_values[record_value].append(dns_server_name)
-            unique_values.add(record_value)
-        
-        # Collect discrepancies only if there are multiple unique values
-        if len(unique_values) > 1:
-            for value, servers in record_values.items():
-                discrepancies.setdefault(record_type, {})[value] = servers
+    discrepancies = find_discrepancies(dns_results, record_checks)
     
     # Report discrepancies
     if discrepancies:
@@ -112,30 +73,17 @@ def invoke_m365_check():
     st.markdown(DESCRIPTION)
     
     domain = st.text_input("Domain", "example.com", key="m365_check_domain")
-    if st.button("Check", key="m365_check_check"):
+    if remember_check("m365_check_checked", st.button("Check", key="m365_check_check"), domain=domain):
         with st.spinner("Checking..."):
             st.divider()
             st.header("Status for DNS Configuration")
             
-            record_checks = {
-                "MX": check_mx_record,
-                "SPF": check_spf_record,
-                "VerifyDomain": check_verify_domain_record,
-                "autodiscover": lambda domain, dns_server: check_cname_record("autodiscover", domain, dns_server),
-                "lyncdiscover": lambda domain, dns_server: check_cname_record("lyncdiscover", domain, dns_server),
-                "selector1._domainkey": lambda domain, dns_server: check_cname_record("selector1._domainkey", domain, dns_server),
-                "selector2._domainkey": lambda domain, dns_server: check_cname_record("selector2._domainkey", domain, dns_server)
-            }
-            
-            dns_results = defaultdict(dict)
-            for dns_server_name, dns_server in DNS_SERVERS.items():
-                for record_type, check_func in record_checks.items():
-                    dns_results[dns_server_name][record_type] = check_func(domain, dns_server)
+            dns_results = select_m365_results(domain, cached_fetch_m365_answers(domain))
             
-            for record_type in record_checks.keys():
+            for record_type in RECORD_CHECKS.keys():
                 check_record_status(dns_results, record_type)
             
-            check_discrepancies(dns_results, record_checks)
+            check_discrepancies(dns_results, RECORD_CHECKS)
             
             st.divider()
             
@@ -0,0 +1,153 @@
+from collections import defaultdict
+from internal.dns.dns import get_dns_record, is_valid_answer, DNS_SERVERS
+from internal.dns.race import resolve_consensus
+
+# Time budget in seconds for all lookups of a single M365 check
+CHECK_DEADLINE = 5.0
+
+#MARK: - Record Checks
+def select_spf_record(records):
+    """Return the TXT record that includes spf.protection.outlook.com, if any."""
+    return next((record for record in records if "spf.protection.outlook.com" in record), None)
+
+def select_verify_domain_record(records):
+    """Return the Microsoft Domain Verification TXT record, if any."""
+    return next((record for record in records if "v=verifydomain MS=" in record), None)
+
+def check_mx_record(domain, dns_server):
+    """Check if the MX record for the domain is valid on the given DNS server."""
+    return get_dns_record(domain, dns_server, "MX")
+
+def check_spf_record(domain, dns_server):
+    """Check if the SPF record for the domain exists on the given DNS server."""
+    return select_spf_record(get_dns_record(domain, dns_server, "TXT"))
+
+def check_verify_domain_record(domain, dns_server):
+    """Check if the Microsoft Domain Verification record for the domain exists on the given DNS server."""
+    return select_verify_domain_record(get_dns_record(domain, dns_server, "TXT"))
+
+def check_cname_record(record_name, domain, dns_server):
+    """Check if the CNAME record for the given record name exists on the given DNS server."""
+    return get_dns_record(f"{record_name}.{domain}", dns_server, "CNAME")
+
+#MARK: - Query Plan
+# Each check maps to (subdomain, record type, selector applied to the returned records)
+RECORD_CHECKS = {
+    "MX": ("", "MX", list),
+    "SPF": ("", "TXT", select_spf_record),
+    "VerifyDomain": ("", "TXT", select_verify_domain_record),
+    "autodiscover": ("autodiscover", "CNAME", list),
+    "lyncdiscover": ("lyncdiscover", "CNAME", list),
+    "selector1._domainkey": ("selector1._domainkey", "CNAME", list),
+    "selector2._domainkey": ("selector2._domainkey", "CNAME", list),
+}
+
+def plan_m365_queries(domain):
+    """Map every check to the (name, type) question it needs."""
+    return {
+        record_type: (f"{subdomain}.{domain}" if subdomain else domain, query_type)
+        for record_type, (subdomain, query_type, _) in RECORD_CHECKS.items()
+    }
+
+def fetch_m365_answers(domain, deadline=CHECK_DEADLINE):
+    """
+    Run all M365 lookups for a domain concurrently.
+
+    Every question is asked to every DNS server in consensus mode, so the
+    discrepancy check compares complete answers. The SPF and VerifyDomain
+    checks share a single TXT lookup per DNS server, so the 21 checks only
+    need 18 queries, all of which run in parallel.
+
+    Returns:
+        dict: {(domain, type): {dns_server_name: records}}, see resolve_consensus.
+    """
+    return resolve_consensus(plan_m365_queries(domain).values(), DNS_SERVERS, deadline=deadline)
+
+def is_complete_answers(answers):
+    """Check that every DNS server answered every question, without timeouts or server failures."""
+    return all(is_valid_answer(records) for results in answers.values() for records in results.values())
+
+def select_m365_results(domain, answers):
+    """
+    Apply the selector of every check to the answers of fetch_m365_answers.
+
+    Returns:
+        defaultdict: The check results keyed by DNS server name and record type.
+    """
+    dns_results = defaultdict(dict)
+    for record_type, question in plan_m365_queries(domain).items():
+        select = RECORD_CHECKS[record_type][2]
+        for dns_server_name, records in answers[question].items():
+            dns_results[dns_server_name][record_type] = select(records)
+    return dns_results
+
+def fetch_m365_results(domain, deadline=CHECK_DEADLINE):
+    """Run all M365 lookups for a domain, returns the results of select_m365_results."""
+    return select_m365_results(domain, fetch_m365_answers(domain, deadline))
+
+#MARK: - Results
+def get_record_status(dns_results, record_type):
+    """Return "verified", "partial" or "missing" for a record type across all DNS servers."""
+    record_status = [dns_results[dns_server_name][record_type] for dns_server_name in DNS_SERVERS.keys()]
+    
+    if all(record_status):
+        return "verified"
+    elif any(record_status):
+        return "partial"
+    else:
+        return "missing"
+
+def find_discrepancies(dns_results, record_checks):
+    """Return the differing values per record type, mapped to the DNS servers that returned them."""
+    discrepancies = {}
+    
+    for record_type in record_checks.keys():
+        record_values = {}
+        unique_values = set()
+
+        for dns_server_name in DNS_SERVERS.keys():
+            record_value = dns_results[dns_server_name][record_type]
+            # Handle None values by converting them to an empty tuple
+            if record_value is None:
+                record_value = ()
+            elif isinstance(record_value, list):
+                # Convert lists to tuples
+                record_value = tuple(record_value)
+            elif isinstance(record_value, str):
+                # Keep strings as single-element tuples
+                record_value = (record_value,)
+
+            if record_value not in record_values:
+                record_values[record_value] = [dns_server_name]
+            else:
+                record_values[record_value].append(dns_server_name)
+            unique_values.add(record_value)
+        
+        # Collect discrepancies only if there are multiple unique values
+        if len(unique_values) > 1:
+            for value, servers in record_values.items():
+                discrepancies.setdefault(record_type, {})[value] = servers
+    
+    return discrepancies
+
+def run_m365_check(domain, deadline=CHECK_DEADLINE):
+    """
+    Run the M365 check for a domain and return the results as plain data.
+
+    Returns:
+        dict: The raw results per DNS server and record type, the status of every
+        record type ("verified", "partial" or "missing") and a list of the
+        discrepancies between the DNS servers.
+    """
+    dns_results = fetch_m365_results(domain, deadline)
+    discrepancies = find_discrepancies(dns_results, RECORD_CHECKS)
+    return {
+        "domain": domain,
+        "results": {dns_server_name: dict(results) for dns_server_name, results in dns_results.items()},
+        "status": {record_type: get_record_status(dns_results, record_type) for record_type in RECORD_CHECKS.keys()},
+        "discrepancies": [
+            {"record_type": record_type, "value": list(value), "servers": servers}
+            for record_type, values in discrepancies.items()
+            for value, servers in values.items()
+        ],
+    }
@@ -0,0 +1,78 @@
+import streamlit as st
+from internal.dns.dns import DNS_SERVERS
+from internal.dns.pool import get_dns_server_options, describe_dns_server, AUTOMATIC
+from internal.cache import memoize, remember_check
+from internal.mail.core import analyze_mail_security, is_complete_analysis, DKIM_SELECTORS, MAX_DKIM_SELECTORS, SPF_LOOKUP_LIMIT
+
+DESCRIPTION = f"""
+A mail security check analyzes how a domain protects its mail against spoofing and downgrades:
+- SPF, including the whole include tree and the limit of {SPF_LOOKUP_LIMIT} DNS lookups
+- DMARC policy and reporting
+- DKIM keys of common selectors
+- MTA-STS and TLS-RPT
+"""
+
+# Page results are kept for a few minutes so reruns don't repeat the lookups.
+# Analyses with failed lookups are not kept, so a retry asks again.
+cached_analyze_mail_security = memoize("mail_security", ttl=300, cache_if=is_complete_analysis)(analyze_mail_security)
+
+SEVERITY_DISPLAY = {"ok": st.success, "info": st.info, "warning": st.warning, "error": st.error}
+
+def spf_tree_lines(spf, name, depth=0, path=()):
+    """Render the SPF include tree below a domain as indented markdown list items."""
+    node = spf["tree"].get(name)
+    if node is None:
+        return [f"{'    ' * depth}- `{name}` (not expanded)"]
+    if name in path:
+        return [f"{'    ' * depth}- `{name}` (loop)"]
+    if node["record"] is None:
+        return [f"{'    ' * depth}- `{name}`: {node['error']}"]
+    lines = [f"{'    ' * depth}- `{name}` (DNS lookups: {node['total_lookups']})  \n{'    ' * depth}  `{node['record']}`"]
+    for target in node["includes"] + ([node["redirect"]] if node["redirect"] else []):
+        lines += spf_tree_lines(spf, target, depth + 1, path + (name,))
+    return lines
+
+def display_mail_security(result):
+    """Display the findings of a mail security check, then the records of every check."""
+    for finding in result["findings"]:
+        SEVERITY_DISPLAY[finding["severity"]](f"{finding['check']}: {finding['message']}")
+    st.caption(f"Resolved in {result['round_trips']} round trips on {result['dns_server']}.")
+
+    st.subheader("SPF")
+    spf = result["spf"]
+    st.markdown("\n".join(spf_tree_lines(spf, result["domain"])))
+
+    st.subheader("DMARC")
+    st.code(result["dmarc"]["record"] or "No record", language=None)
+
+    st.subheader("DKIM")
+    if result["dkim"]:
+        st.dataframe([
+            {"Selector": selector, "Key type": key["tags"].get("k", "rsa"), "Revoked": key["revoked"], "Record": key["record"]}
+            for selector, key in result["dkim"].items()
+        ], hide_index=True)
+    else:
+        st.write("No DKIM keys found.")
+
+    st.subheader("MTA-STS and TLS-RPT")
+    st.code(f"{result['mta_sts']['record'] or 'No MTA-STS record'}\n{result['tls_rpt']['record'] or 'No TLS-RPT record'}", language=None)
+
+def invoke_mail_security_check():
+    """Analyze the mail authentication records of a domain."""
+    st.write("# Mail Security")
+    st.markdown(DESCRIPTION)
+
+    domain = st.text_input("Domain", "example.com", key="mail_security_domain")
+    dns_server = st.selectbox("DNS Server", get_dns_server_options(), format_func=describe_dns_server, key="mail_security_dns_server")
+    selectors = st.text_input("DKIM selectors", ", ".join(DKIM_SELECTORS), key="mail_security_selectors")
+    if remember_check("mail_security_checked", st.button("Check", key="mail_security_check"), domain=domain, dns_server=dns_server, selectors=selectors):
+        selectors = tuple(dict.fromkeys(selector.strip() for selector in selectors.split(",") if selector.strip()))
+        if len(selectors) > MAX_DKIM_SELECTORS:
+            st.warning(f"Only the first {MAX_DKIM_SELECTORS} DKIM selectors are checked.")
+            selectors = selectors[:MAX_DKIM_SELECTORS]
+        with st.spinner("Checking..."):
+            result = cached_analyze_mail_security(
+                domain or "", None if dns_server == AUTOMATIC else DNS_SERVERS[dns_server], selectors,
+            )
+        st.divider()
+        display_mail_security(result)
@@ -0,0 +1,356 @@
+import re
+import time
+from internal.dns.dns import resolve_many, is_valid_answer, normalize_record, DNS_SERVERS, NXDOMAIN_ERROR, NO_ANSWER_ERROR
+from internal.dns.pool import best_dns_server
+
+# Time budget in seconds for all lookups of a single mail security check
+MAIL_DEADLINE = 10.0
+
+# RFC 7208 4.6.4: an SPF evaluation may cause at most 10 DNS lookups, and at most 2 of them may return nothing
+SPF_LOOKUP_LIMIT = 10
+SPF_VOID_LOOKUP_LIMIT = 2
+SPF_LOOKUP_MECHANISMS = {"include", "a", "mx", "ptr", "exists"}
+# Include trees are not expanded deeper or wider than this, whatever the lookup count says
+MAX_SPF_DEPTH = 10
+MAX_SPF_RECORDS = 100
+
+# DKIM selectors can't be listed, so the common ones are tried: Microsoft 365, Google Workspace, Mailchimp and generic names
+DKIM_SELECTORS = ["selector1", "selector2", "google", "k1", "k2", "s1", "s2", "default", "dkim", "mail"]
+# Every selector is one more lookup, callers taking selectors from users accept at most this many
+MAX_DKIM_SELECTORS = 20
+
+SPF_MODIFIER = re.compile(r"^[a-z][a-z0-9_.-]*=", re.IGNORECASE)
+
+#MARK: - Records
+def txt_strings(records):
+    """Return the TXT strings of an answer, with split strings joined and without a CNAME the answer may start with."""
+    return [normalize_record("TXT", record) for record in records if record.startswith('"')]
+
+def select_record(records, version):
+    """
+    Return the TXT records that start with a version tag like "v=spf1" or "v=DMARC1".
+
+    The tag is matched case-insensitively and must be followed by a separator or the end of the record.
+    """
+    version = version.lower()
+    return [
+        record for record in txt_strings(records)
+        if record.lower().startswith(version) and record[len(version):len(version) + 1] in ("", " ", ";")
+    ]
+
+def parse_tags(record):
+    """Parse a "tag=value; tag=value" record (DMARC, DKIM, MTA-STS, TLS-RPT) into a dict with lowercase tags."""
+    tags = {}
+    for part in record.split(";"):
+        tag, separator, value = part.partition("=")
+        if separator and tag.strip():
+            tags[tag.strip().lower()] = value.strip()
+    return tags
+
+def is_void(records):
+    """Check if a lookup returned nothing, which counts against the SPF void lookup limit."""
+    return len(records) == 1 and records[0] in (NXDOMAIN_ERROR, NO_ANSWER_ERROR)
+
+#MARK: - SPF
+def parse_spf(record):
+    """
+    Parse an SPF record into its terms.
+
+    Returns:
+        dict: The "mechanisms" as (qualifier, name, value) tuples, the "modifiers"
+        by name, the "includes" and "redirect" domains to expand, the number of
+        DNS "lookups" the record itself causes and the "macros" that can't be expanded.
+    """
+    mechanisms, modifiers = [], {}
+    for term in record.split()[1:]:
+        if SPF_MODIFIER.match(term):
+            name, _, value = term.partition("=")
+            modifiers[name.lower()] = value
+            continue
+        qualifier = term[0] if term[0] in "+-~?" else "+"
+        term = term.lstrip("+-~?")
+        name, _, value = term.partition(":")
+        if not value and "/" in name:
+            # a/24 and mx/24 carry a prefix length instead of a domain
+            name, _, value = name.partition("/")
+            value = "/" + value
+        mechanisms.append((qualifier, name.lower(), value))
+
+    names = [name for _, name, _ in mechanisms]
+    # The redirect modifier is ignored when the record has an "all" mechanism
+    redirect = modifiers.get("redirect") if "all" not in names else None
+    targets = [value for _, name, value in mechanisms if name == "include"] + ([redirect] if redirect else [])
+    return {
+        "mechanisms": mechanisms,
+        "modifiers": modifiers,
+        "includes": [value.lower().rstrip(".") for _, name, value in mechanisms if name == "include" and "%" not in value],
+        "redirect": redirect.lower().rstrip(".") if redirect and "%" not in redirect else None,
+        "lookups": sum(name in SPF_LOOKUP_MECHANISMS for name in names) + bool(redirect),
+        "macros": [target for target in targets if "%" in target],
+    }
+
+def make_spf_node(records):
+    """Turn the TXT answer of a domain into a node of the SPF include tree."""
+    node = {"record": None, "error": None, "failed": False, "void": is_void(records), "includes": [], "redirect": None, "lookups": 0}
+    if not is_valid_answer(records):
+        node["error"], node["failed"] = records[0], True
+        return node
+    spf_records = select_record(records, "v=spf1")
+    if not spf_records:
+        node["error"] = "No SPF record found."
+    elif len(spf_records) > 1:
+        node["error"] = f"{len(spf_records)} SPF records found, only one is allowed."
+    else:
+        node["record"] = spf_records[0]
+        node.update(parse_spf(spf_records[0]))
+    return node
+
+def expand_spf_tree(domain, dns_server, answers=None, deadline=MAIL_DEADLINE):
+    """
+    Resolve the SPF include and redirect tree of a domain, one level at a time.
+
+    All domains of a level are resolved in one concurrent batch, so the tree
+    takes one round trip per level. A domain that shows up several times in
+    the tree is only resolved once, and every lookup goes through the shared
+    answer cache, so includes used by many domains (spf.protection.outlook.com,
+    _spf.google.com, ...) are resolved once per TTL for all of them.
+
+    Args:
+        answers (dict): TXT answers already resolved by the caller, keyed by domain.
+
+    Returns:
+        tuple: (nodes, levels) with the tree nodes keyed by domain and the number of levels that needed lookups.
+    """
+    started = time.monotonic()
+    answers = dict(answers or {})
+    nodes = {}
+    level = [domain]
+    levels = 0
+    for _ in range(MAX_SPF_DEPTH + 1):
+        if not level or len(nodes) >= MAX_SPF_RECORDS:
+            break
+        missing = [name for name in level if name not in answers]
+        if missing:
+            remaining = max(0.1, deadline - (time.monotonic() - started))
+            resolved = resolve_many([(name, dns_server, "TXT") for name in missing], deadline=remaining)
+            answers.update((name, records) for (name, _, _), records in resolved.items())
+            levels += 1
+        next_level = []
+        for name in level:
+            node = nodes[name] = make_spf_node(answers[name])
+            for target in node["includes"] + ([node["redirect"]] if node["redirect"] else []):
+                if target not in nodes and target not in next_level:
+                    next_level.append(target)
+        level = next_level[:MAX_SPF_RECORDS - len(nodes)]
+    return nodes, levels
+
+def count_spf_lookups(domain, nodes):
+    """
+    Count the DNS lookups an SPF evaluation of the domain causes.
+
+    Like a receiving mail server, an include used twice is counted twice.
+    Include loops are reported instead of being followed.
+
+    Returns:
+        tuple: (totals, loops) with the (lookups, void_lookups) of every subtree keyed by domain, and the loops as lists of domains.
+    """
+    totals = {}
+    loops = []
+
+    def visit(name, path):
+        if name in path:
+            loops.append(list(path[path.index(name):]) + [name])
+            return 0, 0
+        if name in totals:
+            return totals[name]
+        node = nodes.get(name)
+        if node is None:
+            return 0, 0
+        lookups, void_lookups = node["lookups"], 0
+        for target in node["includes"] + ([node["redirect"]] if node["redirect"] else []):
+            child = nodes.get(target)
+            if child is not None and child["void"]:
+                void_lookups += 1
+            child_lookups, child_void_lookups = visit(target, path + (name,))
+            lookups += child_lookups
+            void_lookups += child_void_lookups
+        totals[name] = lookups, void_lookups
+        return totals[name]
+
+    visit(domain, ())
+    return totals, loops
+
+#MARK: - Query Plan
+def plan_mail_queries(domain, selectors=DKIM_SELECTORS):
+    """Map every record of the check to the (name, type) question it needs, all asked in the first batch."""
+    plan = {
+        "SPF": (domain, "TXT"),
+        "MX": (domain, "MX"),
+        "DMARC": (f"_dmarc.{domain}", "TXT"),
+        "MTA-STS": (f"_mta-sts.{domain}", "TXT"),
+        "TLS-RPT": (f"_smtp._tls.{domain}", "TXT"),
+    }
+    for selector in selectors:
+        plan[f"DKIM {selector}"] = (f"{selector}._domainkey.{domain}", "TXT")
+    return plan
+
+#MARK: - Analysis
+def analyze_spf(domain, dns_server, root_records, deadline):
+    nodes, levels = expand_spf_tree(domain, dns_server, {domain: root_records}, deadline)
+    totals, loops = count_spf_lookups(domain, nodes)
+    lookups, void_lookups = totals.get(domain, (0, 0))
+    root = nodes[domain]
+    findings = []
+    if root["record"] is None:
+        findings.append(("error", root["error"]))
+    else:
+        if lookups > SPF_LOOKUP_LIMIT:
+            findings.append(("error", f"The SPF record needs {lookups} DNS lookups, more than the limit of {SPF_LOOKUP_LIMIT}."))
+        else:
+            findings.append(("ok", f"The SPF record needs {lookups} of {SPF_LOOKUP_LIMIT} DNS lookups."))
+        if void_lookups > SPF_VOID_LOOKUP_LIMIT:
+            findings.append(("error", f"{void_lookups} SPF lookups return nothing, more than the limit of {SPF_VOID_LOOKUP_LIMIT}."))
+        for loop in loops:
+            findings.append(("error", f"Include loop: {' → '.join(loop)}."))
+        for name, node in nodes.items():
+            if name != domain and node["record"] is None:
+                findings.append(("error", f"Include {name}: {node['error']}"))
+        all_qualifiers = [qualifier for qualifier, name, _ in root["mechanisms"] if name == "all"]
+        if "+" in all_qualifiers:
+            findings.append(("error", "The SPF record ends with +all and allows every server to send mail."))
+        elif "?" in all_qualifiers:
+            findings.append(("warning", "The SPF record ends with ?all and doesn't protect the domain."))
+        elif not all_qualifiers and not root["redirect"]:
+            findings.append(("warning", "The SPF record has no all mechanism, unlisted servers are treated as neutral."))
+        macros = [macro for node in nodes.values() for macro in node.get("macros", [])]
+        if macros:
+            findings.append(("info", f"SPF macros are evaluated per message and were not expanded: {', '.join(macros)}"))
+    spf = {
+        "record": root["record"],
+        "lookups": lookups,
+        "void_lookups": void_lookups,
+        "levels": levels,
+        "loops": loops,
+        "tree": {name: dict(node, total_lookups=totals.get(name, (0, 0))[0]) for name, node in nodes.items()},
+    }
+    return spf, findings
+
+def analyze_dmarc(records):
+    if not is_valid_answer(records):
+        return {"record": None, "tags": {}}, [("error", f"DMARC lookup failed: {records[0]}")]
+    dmarc_records = select_record(records, "v=DMARC1")
+    if not dmarc_records:
+        return {"record": None, "tags": {}}, [("error", "No DMARC record found, receivers won't enforce SPF and DKIM for the domain.")]
+    if len(dmarc_records) > 1:
+        return {"record": None, "tags": {}}, [("error", f"{len(dmarc_records)} DMARC records found, receivers ignore all of them.")]
+    tags = parse_tags(dmarc_records[0])
+    policy = tags.get("p", "").lower()
+    findings = []
+    if policy in ("quarantine", "reject"):
+        findings.append(("ok", f"The DMARC policy is {policy}."))
+    elif policy == "none":
+        findings.append(("warning", "The DMARC policy is none, failing mail is only reported."))
+    else:
+        findings.append(("error", f"The DMARC record has an invalid policy {tags.get('p')!r}."))
+    if tags.get("pct", "100") != "100":
+        findings.append(("warning", f"The DMARC policy only applies to {tags['pct']}% of the failing mail."))
+    if "rua" not in tags:
+        findings.append(("warning", "The DMARC record requests no aggregate reports (rua)."))
+    return {"record": dmarc_records[0], "tags": tags}, findings
+
+def analyze_dkim(answers):
+    """Check the DKIM keys published for the tried selectors, answers are keyed by selector."""
+    dkim = {}
+    for selector, records in answers.items():
+        keys = [record for record in txt_strings(records) if "p=" in record]
+        if keys:
+            tags = parse_tags(keys[0])
+            dkim[selector] = {"record": keys[0], "tags": tags, "revoked": not tags.get("p")}
+    findings = []
+    active = [selector for selector, key in dkim.items() if not key["revoked"]]
+    if active:
+        findings.append(("ok", f"DKIM keys found for the selectors {', '.join(active)}."))
+    else:
+        findings.append(("warning", f"No DKIM key found for the common selectors {', '.join(answers)}. The domain may use a different selector."))
+    for selector, key in dkim.items():
+        if key["revoked"]:
+            findings.append(("info", f"The DKIM key of the selector {selector} is revoked."))
+    return dkim, findings
+
+def analyze_tagged_record(records, version, missing_severity, missing_message):
+    """Check a record like MTA-STS or TLS-RPT that only has to exist once."""
+    tagged_records = select_record(records, version)
+    if len(tagged_records) == 1:
+        return {"record": tagged_records[0], "tags": parse_tags(tagged_records[0])}, []
+    if len(tagged_records) > 1:
+        return {"record": None, "tags": {}}, [("error", f"{len(tagged_records)} {version} records found, only one is allowed.")]
+    return {"record": None, "tags": {}}, [(missing_severity, missing_message)]
+
+def analyze_mail_security(domain, dns_server=None, selectors=DKIM_SELECTORS, deadline=MAIL_DEADLINE):
+    """
+    Analyze the SPF, DMARC, DKIM, MTA-STS and TLS-RPT setup of a domain.
+
+    The records of all checks and the SPF record are resolved in one
+    concurrent batch, then the SPF include tree is expanded one level per
+    round trip. dns_server defaults to the best scoring DNS server.
+
+    Returns:
+        dict: The parsed records of every check, a list of "findings", each
+        with a "check", a "severity" ("ok", "info", "warning" or "error") and a "message",
+        and the "failed_lookups" that timed out or failed.
+    """
+    started = time.monotonic()
+    domain = domain.strip().rstrip(".").lower()
+    dns_server = dns_server or DNS_SERVERS[best_dns_server()]
+    plan = plan_mail_queries(domain, selectors)
+    answers = resolve_many([(name, dns_server, type) for name, type in plan.values()], deadline=deadline)
+    records = {check: answers[(name, dns_server, type)] for check, (name, type) in plan.items()}
+    failed_lookups = [f"{check} {plan[check][0]}" for check, check_records in records.items() if not is_valid_answer(check_records)]
+
+    remaining = max(0.1, deadline - (time.monotonic() - started))
+    spf, spf_findings = analyze_spf(domain, dns_server, records["SPF"], remaining)
+    failed_lookups += [f"SPF {name}" for name, node in spf["tree"].items() if node["failed"] and name != domain]
+    dmarc, dmarc_findings = analyze_dmarc(records["DMARC"])
+    dkim, dkim_findings = analyze_dkim({selector: records[f"DKIM {selector}"] for selector in selectors})
+    mta_sts, mta_sts_findings = analyze_tagged_record(
+        records["MTA-STS"], "v=STSv1", "warning", "No MTA-STS record found, sending servers may deliver mail without TLS."
+    )
+    tls_rpt, tls_rpt_findings = analyze_tagged_record(
+        records["TLS-RPT"], "v=TLSRPTv1", "info", "No TLS-RPT record found, TLS delivery failures are not reported."
+    )
+    # Only NXDOMAIN and NODATA mean there are no MX records, timeouts and server failures are failed lookups
+    mx, mx_findings = [], []
+    if is_void(records["MX"]):
+        mx_findings.append(("info", "The domain has no MX records and doesn't receive mail."))
+    elif not is_valid_answer(records["MX"]):
+        mx_findings.append(("error", f"MX lookup failed: {records['MX'][0]}"))
+    else:
+        mx = records["MX"]
+
+    findings = [
+        {"check": check, "severity": severity, "message": message}
+        for check, check_findings in [
+            ("MX", mx_findings), ("SPF", spf_findings), ("DMARC", dmarc_findings), ("DKIM", dkim_findings),
+            ("MTA-STS", mta_sts_findings), ("TLS-RPT", tls_rpt_findings),
+        ]
+        for severity, message in check_findings
+    ]
+    return {
+        "domain": domain,
+        "dns_server": dns_server,
+        "mx": mx,
+        "spf": spf,
+        "dmarc": dmarc,
+        "dkim": dkim,
+        "mta_sts": mta_sts,
+        "tls_rpt": tls_rpt,
+        "findings": findings,
+        # Lookups that timed out or failed, "check name" each
+        "failed_lookups": failed_lookups,
+        # The first batch plus one round trip per SPF include level
+        "round_trips": 1 + spf["levels"],
+    }
+
+def is_complete_analysis(result):
+    """Check that no lookup of a mail security analysis timed out or failed."""
+    return not result["failed_lookups"]
@@ -0,0 +1,169 @@
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.environ.get("DNSTOOLBOX_METRICS_PORT", 9101))
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Number of recent spans kept for the diagnostics page
+RECENT_SPANS = 200
+
+#MARK: - Histogram
+class Histogram:
+    """Cumulative bucket histogram in the Prometheus format."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside the bucket that contains it."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+#MARK: - Registry
+class MetricsRegistry:
+    """
+    Collects timing histograms, counters and recent spans of the DNS and TLS code paths.
+
+    Callers check `enabled` before recording anything, so a disabled registry
+    costs a single attribute lookup on the hot path.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.spans = deque(maxlen=RECENT_SPANS)
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def record_dns_query(self, resolver, type, rcode, duration, retries=0, cache_hit=False):
+        """Record a DNS lookup, either answered from the cache or sent to the resolver."""
+        self.increment("dnstoolbox_dns_cache_lookups_total", result="hit" if cache_hit else "miss")
+        if not cache_hit:
+            self.observe("dnstoolbox_dns_query_duration_seconds", duration, resolver=resolver, type=type, rcode=rcode)
+            if retries:
+                self.increment("dnstoolbox_dns_query_retries_total", retries, resolver=resolver)
+        self.spans.append({
+            "time": time.time(), "kind": "dns", "target": resolver, "type": type, "result": rcode,
+            "duration": duration, "retries": retries, "cache_hit": cache_hit,
+        })
+
+    def record_tls_handshake(self, target, outcome, connect_time, handshake_time, protocol=None):
+        """
+        Record a TLS scan. The outcome is "ok", "verify_failed", "timeout" or "error".
+
+        The certificate is verified during the handshake, so there is no separate
+        verification timing: the handshake time of "verify_failed" scans is the
+        time until the chain was rejected.
+        """
+        self.increment("dnstoolbox_tls_handshakes_total", outcome=outcome)
+        if connect_time is not None:
+            self.observe("dnstoolbox_tls_connect_duration_seconds", connect_time, outcome=outcome)
+        if handshake_time is not None:
+            self.observe("dnstoolbox_tls_handshake_duration_seconds", handshake_time, outcome=outcome, protocol=protocol or "")
+        self.spans.append({
+            "time": time.time(), "kind": "tls", "target": target, "type": protocol, "result": outcome,
+            "duration": (connect_time or 0.0) + (handshake_time or 0.0), "retries": 0, "cache_hit": False,
+        })
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.spans.clear()
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def format_labels(labels, extra=()):
+            labels = list(labels) + list(extra)
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+METRICS = MetricsRegistry(enabled=os.environ.get("DNSTOOLBOX_METRICS", "").lower() in ("1", "true", "yes"))
+
+#MARK: - Metrics Endpoint
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on the given port from a background thread, once per process."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
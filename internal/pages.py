@@ -0,0 +1,52 @@
+import importlib
+
+#MARK: - Page Registry
+class PageRegistry:
+    """
+    The pages of the app by name, imported on first use.
+
+    Pages are registered as "module:function" paths, so a page module and the
+    heavy libraries it uses (pandas, dnspython, ...) are only imported when
+    the page is selected for the first time. The registry lives in an
+    imported module, so it survives the script reruns and loaded pages stay
+    warm for every later run and session.
+    """
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self._loaded = {}
+
+    def names(self):
+        return list(self.pages.keys())
+
+    def get(self, name):
+        """Return the function of a page, importing its module if needed."""
+        func = self._loaded.get(name)
+        if func is None:
+            module_name, func_name = self.pages[name].split(":")
+            func = self._loaded[name] = getattr(importlib.import_module(module_name), func_name)
+        return func
+
+    def load_all(self):
+        """Import every page, e.g. to warm up a worker before it takes traffic."""
+        for name in self.pages:
+            self.get(name)
+
+PAGES = PageRegistry({
+    "-": "internal.intro:get_intro",
+    "M365 Check": "internal.m365.check:invoke_m365_check",
+    "Mail Security": "internal.mail.check:invoke_mail_security_check",
+    "A Record": "internal.dns.a:get_a_record",
+    "AAAA Record": "internal.dns.aaaa:get_aaaa_record",
+    "CNAME Record": "internal.dns.cname:get_cname_record",
+    "MX Record": "internal.dns.mx:get_mx_record",
+    "NS Record": "internal.dns.ns:get_ns_record",
+    "TXT Record": "internal.dns.txt:get_txt_record",
+    "All Records": "internal.dns.all:get_all_records",
+    "Propagation Watch": "internal.dns.propagation:invoke_propagation_watch",
+    "SSL Check": "internal.ssl.check:invoke_ssl_check",
+    "Certificate Monitor": "internal.ssl.dashboard:invoke_certificate_monitor",
+    "Bulk Audit": "internal.bulk.page:invoke_bulk_audit",
+    "Cache Admin": "internal.admin:invoke_cache_admin",
+    "Diagnostics": "internal.diagnostics:invoke_diagnostics",
+})
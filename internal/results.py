@@ -0,0 +1,160 @@
+import math
+from array import array
+import streamlit as st
+
+# Rows sent to the browser at a time, the rest of a table stays on the server
+PAGE_SIZE = 100
+# Columns with at most this many distinct values get a filter of their own
+MAX_FACET_VALUES = 20
+
+#MARK: - Result Table
+class ResultTable:
+    """
+    Columnar store for large result sets, like the rows of a bulk audit.
+
+    Rows are not kept as dicts, every column is a list of its own. Columns
+    with few distinct values (DNS servers, record types, statuses) are
+    categorical: each distinct value is stored once and the rows only hold
+    a 4 byte code in an array. Filtering a categorical column compares codes,
+    and a text filter only has to check every distinct value once.
+
+    Args:
+        columns (list): The column names, in display order.
+        categorical (iterable): The columns to store as codes.
+    """
+
+    def __init__(self, columns, categorical=()):
+        self.columns = list(columns)
+        self.categorical = [column for column in self.columns if column in set(categorical)]
+        self._data = {column: array("I") if column in self.categorical else [] for column in self.columns}
+        self._categories = {column: [] for column in self.categorical}
+        self._codes = {column: {} for column in self.categorical}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, row):
+        """Add a row given as a dict, missing columns are stored as None."""
+        for column in self.columns:
+            value = row.get(column)
+            if column in self._codes:
+                codes = self._codes[column]
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(self._categories[column])
+                    self._categories[column].append(value)
+                self._data[column].append(code)
+            else:
+                self._data[column].append(value)
+        self._length += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def categories(self, column):
+        """Return the distinct values of a categorical column, in order of appearance."""
+        return list(self._categories[column])
+
+    def filter(self, text="", **values):
+        """
+        Return the indices of the rows that match all filters.
+
+        Args:
+            text (str): Keep rows that contain the text in any column, ignoring case.
+            **values: Keep rows whose categorical column has one of the given values.
+
+        Returns:
+            range or list: The matching row indices, all rows if no filter is given.
+        """
+        matches = range(self._length)
+        for column, allowed in values.items():
+            codes = {self._codes[column][value] for value in allowed if value in self._codes[column]}
+            data = self._data[column]
+            matches = [index for index in matches if data[index] in codes]
+
+        text = text.strip().lower()
+        if text:
+            found = bytearray(self._length)
+            for column in self.columns:
+                data = self._data[column]
+                if column in self._codes:
+                    codes = {code for code, value in enumerate(self._categories[column]) if value is not None and text in str(value).lower()}
+                    for index in matches:
+                        if data[index] in codes:
+                            found[index] = 1
+                else:
+                    for index in matches:
+                        value = data[index]
+                        if value is not None and text in str(value).lower():
+                            found[index] = 1
+            matches = [index for index in matches if found[index]]
+        return matches
+
+    def _row(self, index):
+        for column in self.columns:
+            if column in self._codes:
+                yield self._categories[column][self._data[column][index]]
+            else:
+                yield self._data[column][index]
+
+    def slice(self, indices):
+        """Return the given rows as {column: values}, ready for st.dataframe."""
+        sliced = {}
+        for column in self.columns:
+            data = self._data[column]
+            if column in self._codes:
+                categories = self._categories[column]
+                sliced[column] = [categories[data[index]] for index in indices]
+            else:
+                sliced[column] = [data[index] for index in indices]
+        return sliced
+
+    def rows(self, indices=None):
+        """Yield the given rows, or all rows, as dicts."""
+        for index in range(self._length) if indices is None else indices:
+            yield dict(zip(self.columns, self._row(index)))
+
+#MARK: - Table View
+def display_result_table(table, key, page_size=PAGE_SIZE):
+    """
+    Display a result table one page at a time.
+
+    Only the rows of the current page are sent to the browser. Tables with
+    more than one page get a text filter, a filter for every categorical
+    column with a handful of values, and a page selector.
+
+    Args:
+        table (ResultTable): The rows to display.
+        key (str): Prefix for the keys of the filter and page widgets.
+        page_size (int): Rows per page.
+    """
+    indices = range(len(table))
+    if len(table) > page_size:
+        text = st.text_input("Filter", key=f"{key}_filter", placeholder="Show rows containing...")
+        facets = [column for column in table.categorical if 1 < len(table.categories(column)) <= MAX_FACET_VALUES]
+        values = {}
+        for column, container in zip(facets, st.columns(len(facets)) if facets else []):
+            selected = container.multiselect(column, table.categories(column), format_func=str, key=f"{key}_{column}")
+            if selected:
+                values[column] = selected
+        indices = table.filter(text, **values)
+
+    pages = max(1, math.ceil(len(indices) / page_size))
+    page = 1
+    if pages > 1:
+        # The number of pages shrinks when a filter is set, keep the page selector in range
+        if st.session_state.get(f"{key}_page", 1) > pages:
+            st.session_state[f"{key}_page"] = pages
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=f"{key}_page")
+    start = (page - 1) * page_size
+    st.dataframe(table.slice(indices[start:start + page_size]), hide_index=True)
+    if len(indices) > page_size or len(indices) < len(table):
+        st.caption(f"Rows {start + 1 if indices else 0} to {min(start + page_size, len(indices))} of {len(indices)}, {len(table)} in total.")
+
+def display_records(records, key):
+    """Display the records of a lookup as a numbered table."""
+    table = ResultTable(["#", "Record"])
+    table.extend({"#": i + 1, "Record": record} for i, record in enumerate(records))
+    display_result_table(table, key)
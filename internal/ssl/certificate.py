@@ -0,0 +1,353 @@
+import hashlib
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from internal.ssl.der import (
+    read_element, read_children, decode_oid, decode_integer, decode_string, decode_time,
+    BOOLEAN, OID, SEQUENCE,
+)
+
+DAY = 86400
+# Parsed certificates kept in memory, bulk scans mostly see the same few intermediates
+MAX_CACHED_CERTIFICATES = 4096
+
+# Names as getpeercert() reports them
+NAME_ATTRIBUTES = {
+    "2.5.4.3": "commonName",
+    "2.5.4.5": "serialNumber",
+    "2.5.4.6": "countryName",
+    "2.5.4.7": "localityName",
+    "2.5.4.8": "stateOrProvinceName",
+    "2.5.4.9": "streetAddress",
+    "2.5.4.10": "organizationName",
+    "2.5.4.11": "organizationalUnitName",
+    "2.5.4.97": "organizationIdentifier",
+    "1.2.840.113549.1.9.1": "emailAddress",
+}
+SIGNATURE_ALGORITHMS = {
+    "1.2.840.113549.1.1.5": "sha1WithRSAEncryption",
+    "1.2.840.113549.1.1.10": "rsassaPss",
+    "1.2.840.113549.1.1.11": "sha256WithRSAEncryption",
+    "1.2.840.113549.1.1.12": "sha384WithRSAEncryption",
+    "1.2.840.113549.1.1.13": "sha512WithRSAEncryption",
+    "1.2.840.10045.4.3.2": "ecdsa-with-SHA256",
+    "1.2.840.10045.4.3.3": "ecdsa-with-SHA384",
+    "1.2.840.10045.4.3.4": "ecdsa-with-SHA512",
+    "1.3.101.112": "ED25519",
+    "1.3.101.113": "ED448",
+}
+RSA_KEY = "1.2.840.113549.1.1.1"
+EC_KEY = "1.2.840.10045.2.1"
+EC_CURVE_SIZES = {"1.2.840.10045.3.1.7": 256, "1.3.132.0.34": 384, "1.3.132.0.35": 521}
+EDWARDS_KEYS = {"1.3.101.112": ("Ed25519", 256), "1.3.101.113": ("Ed448", 456)}
+
+SUBJECT_ALT_NAME = "2.5.29.17"
+BASIC_CONSTRAINTS = "2.5.29.19"
+AUTHORITY_INFO_ACCESS = "1.3.6.1.5.5.7.1.1"
+OCSP = "1.3.6.1.5.5.7.48.1"
+CA_ISSUERS = "1.3.6.1.5.5.7.48.2"
+
+#MARK: - Certificate Record
+class Certificate(NamedTuple):
+    """
+    The fields of an X.509 certificate the checks use.
+
+    Names are tuples of (attribute, value) pairs, times are Unix timestamps
+    and the subject alternative names are ("DNS", name) or ("IP Address",
+    address) pairs like getpeercert() returns them. The DNS names are also
+    kept in lookup sets, so hostname checks don't have to walk the list.
+    """
+    fingerprint: str
+    version: int
+    serial: str
+    subject: tuple
+    issuer: tuple
+    not_before: int
+    not_after: int
+    subject_alt_names: tuple
+    key_type: str
+    key_size: int
+    signature_algorithm: str
+    is_ca: bool
+    ocsp: tuple
+    ca_issuers: tuple
+    dns_names: frozenset
+    wildcard_domains: frozenset
+    ip_addresses: frozenset
+
+    @property
+    def common_name(self):
+        return next((value for attribute, value in self.subject if attribute == "commonName"), None)
+
+    def days_remaining(self, now=None):
+        """Return the whole days until the certificate expires, negative once it has expired."""
+        return int((self.not_after - (now or time.time())) // DAY)
+
+    def matches(self, hostname):
+        """
+        Check if the certificate is valid for a host name or IP address.
+
+        Like TLS clients (RFC 6125), only the subject alternative names count
+        and a wildcard only stands for the complete leftmost label.
+        """
+        hostname = hostname.strip().rstrip(".").lower()
+        try:
+            return str(ipaddress.ip_address(hostname)) in self.ip_addresses
+        except ValueError:
+            pass
+        label, _, parent = hostname.partition(".")
+        return hostname in self.dns_names or (bool(label) and parent in self.wildcard_domains)
+
+#MARK: - DER Parsing
+def decode_name(value):
+    """Decode a distinguished name into (attribute, value) pairs, in certificate order."""
+    name = []
+    for _, rdn in read_children(value):
+        for _, attribute in read_children(rdn):
+            (_, oid), (tag, text) = read_children(attribute)[:2]
+            oid = decode_oid(oid)
+            name.append((NAME_ATTRIBUTES.get(oid, oid), decode_string(tag, text)))
+    return tuple(name)
+
+def decode_public_key(value):
+    """Return the (key type, key size in bits) of a SubjectPublicKeyInfo."""
+    (_, algorithm), (_, key) = read_children(value)[:2]
+    algorithm = read_children(algorithm)
+    oid = decode_oid(algorithm[0][1])
+    if oid == RSA_KEY:
+        # The bit string starts with the number of unused bits, then the RSAPublicKey sequence
+        _, rsa_key, _ = read_element(key[1:])
+        modulus = read_children(rsa_key)[0][1]
+        return "RSA", int.from_bytes(modulus, "big").bit_length()
+    if oid == EC_KEY:
+        curve = decode_oid(algorithm[1][1]) if len(algorithm) > 1 and algorithm[1][0] == OID else None
+        return "EC", EC_CURVE_SIZES.get(curve)
+    return EDWARDS_KEYS.get(oid, (oid, None))
+
+def decode_subject_alt_names(value):
+    names = []
+    for tag, name in read_children(read_element(value)[1]):
+        if tag == 0x82:
+            names.append(("DNS", bytes(name).decode("ascii", "replace")))
+        elif tag == 0x87 and len(name) in (4, 16):
+            names.append(("IP Address", str(ipaddress.ip_address(bytes(name)))))
+        elif tag == 0x81:
+            names.append(("email", bytes(name).decode("ascii", "replace")))
+        elif tag == 0x86:
+            names.append(("URI", bytes(name).decode("ascii", "replace")))
+    return tuple(names)
+
+def decode_access_locations(value):
+    """Return the (OCSP, CA issuer) URLs of an Authority Information Access extension."""
+    locations = {OCSP: [], CA_ISSUERS: []}
+    for _, description in read_children(read_element(value)[1]):
+        (_, method), (tag, location) = read_children(description)[:2]
+        method = decode_oid(method)
+        if method in locations and tag == 0x86:
+            locations[method].append(bytes(location).decode("ascii", "replace"))
+    return tuple(locations[OCSP]), tuple(locations[CA_ISSUERS])
+
+def decode_certificate(der, fingerprint=None):
+    """
+    Parse a DER encoded X.509 certificate into a Certificate.
+
+    Raises:
+        ValueError: If the data is not a well-formed certificate.
+    """
+    try:
+        return _decode_certificate(der, fingerprint)
+    except (IndexError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed certificate: {e}") from e
+
+def _decode_certificate(der, fingerprint):
+    tag, certificate, _ = read_element(der)
+    if tag != SEQUENCE:
+        raise ValueError("Not a DER encoded certificate")
+    fields = read_children(read_children(certificate)[0][1])
+    version = 1
+    if fields[0][0] == 0xA0:
+        version = decode_integer(read_element(fields[0][1])[1]) + 1
+        fields = fields[1:]
+    (_, serial), (_, signature), (_, issuer), (_, validity), (_, subject), (_, public_key) = fields[:6]
+    (not_before_tag, not_before), (not_after_tag, not_after) = read_children(validity)[:2]
+
+    extensions = {}
+    for tag, value in fields[6:]:
+        if tag == 0xA3:
+            for _, extension in read_children(read_element(value)[1]):
+                parts = read_children(extension)
+                # The critical flag is optional, the value is always last
+                extensions[decode_oid(parts[0][1])] = parts[-1][1]
+
+    subject_alt_names = decode_subject_alt_names(extensions[SUBJECT_ALT_NAME]) if SUBJECT_ALT_NAME in extensions else ()
+    is_ca = False
+    if BASIC_CONSTRAINTS in extensions:
+        constraints = read_children(read_element(extensions[BASIC_CONSTRAINTS])[1])
+        is_ca = bool(constraints) and constraints[0][0] == BOOLEAN and constraints[0][1][0] != 0
+    ocsp, ca_issuers = decode_access_locations(extensions[AUTHORITY_INFO_ACCESS]) if AUTHORITY_INFO_ACCESS in extensions else ((), ())
+    signature_oid = decode_oid(read_children(signature)[0][1])
+    dns_names = {value.lower().rstrip(".") for kind, value in subject_alt_names if kind == "DNS"}
+    serial = f"{decode_integer(serial):X}"
+    key_type, key_size = decode_public_key(public_key)
+
+    return Certificate(
+        fingerprint=fingerprint or hashlib.sha256(der).hexdigest(),
+        version=version,
+        # getpeercert() prints the serial number with an even number of hex digits
+        serial=serial.zfill(len(serial) + len(serial) % 2),
+        subject=decode_name(subject),
+        issuer=decode_name(issuer),
+        not_before=decode_time(not_before_tag, not_before),
+        not_after=decode_time(not_after_tag, not_after),
+        subject_alt_names=subject_alt_names,
+        key_type=key_type,
+        key_size=key_size,
+        signature_algorithm=SIGNATURE_ALGORITHMS.get(signature_oid, signature_oid),
+        is_ca=is_ca,
+        ocsp=ocsp,
+        ca_issuers=ca_issuers,
+        dns_names=frozenset(name for name in dns_names if not name.startswith("*.")),
+        wildcard_domains=frozenset(name[2:] for name in dns_names if name.startswith("*.")),
+        ip_addresses=frozenset(value for kind, value in subject_alt_names if kind == "IP Address"),
+    )
+
+#MARK: - Parse Cache
+class CertificateCache:
+    """
+    Thread-safe LRU cache of parsed certificates, keyed by their SHA-256 fingerprint.
+
+    Hashing the DER bytes is much cheaper than parsing them, so a certificate
+    that is presented again (the same leaf on every rescan, the same
+    intermediate for thousands of hosts) is only parsed once.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_CERTIFICATES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, der):
+        """Return the Certificate of DER bytes, parsing them only if they were not seen before."""
+        fingerprint = hashlib.sha256(der).hexdigest()
+        with self._lock:
+            certificate = self._entries.get(fingerprint)
+            if certificate is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return certificate
+            self.misses += 1
+        certificate = decode_certificate(der, fingerprint)
+        with self._lock:
+            self._entries[fingerprint] = certificate
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return certificate
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": "parsed_certificates",
+                "entries": len(self._entries),
+                "ttl": None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+CERTIFICATES = CertificateCache()
+
+def parse_certificate(der):
+    """Parse DER encoded certificate bytes through the shared cache."""
+    return CERTIFICATES.parse(der)
+
+def leaf_certificate(scan_result):
+    """Return the parsed certificate a scanned server presented, None if it presented none."""
+    chain = scan_result.get("chain") or []
+    return parse_certificate(chain[0]) if chain else None
+
+#MARK: - Certificate Fields
+def format_name(name):
+    """Join the values of a subject or issuer, e.g. "US, Let's Encrypt, R3"."""
+    return ", ".join(value for _, value in name or ())
+
+def format_cert_time(timestamp):
+    """Format a Unix timestamp like getpeercert() does, e.g. "Jan  5 12:00:00 2026 GMT"."""
+    moment = time.gmtime(timestamp)
+    return f"{time.strftime('%b', moment)} {moment.tm_mday:2d} {time.strftime('%H:%M:%S %Y', moment)} GMT"
+
+# The fields get_certificate_metadata returns
+METADATA_FIELDS = ["fingerprint", "subject", "issuer", "serial", "not_before", "not_after"]
+
+def get_certificate_metadata(scan_result):
+    """
+    Extract the fields that are tracked for a scanned certificate.
+
+    Args:
+        scan_result (dict): A result from the TLS scanner.
+
+    Returns:
+        dict: Fingerprint, subject, issuer, serial number and the validity
+        period as Unix timestamps. Fields are None if the server presented no
+        certificate or the scan failed.
+    """
+    certificate = leaf_certificate(scan_result)
+    if certificate is None:
+        return dict.fromkeys(METADATA_FIELDS)
+    return {
+        "fingerprint": certificate.fingerprint,
+        "subject": format_name(certificate.subject) or None,
+        "issuer": format_name(certificate.issuer) or None,
+        "serial": certificate.serial,
+        "not_before": certificate.not_before,
+        "not_after": certificate.not_after,
+    }
+
+def summarize_certificate(scan_result):
+    """
+    Turn a scan result into plain data that can be serialized as JSON.
+
+    Args:
+        scan_result (dict): A result from the TLS scanner.
+
+    Returns:
+        dict: The certificate metadata, days until expiry, the subject
+        alternative names, whether they cover the scanned host, the key and
+        signature algorithm, the SHA-256 fingerprints of the presented chain
+        and the connection details. A certificate that can't be parsed is
+        reported in "error" like a failed scan.
+    """
+    error = scan_result.get("error")
+    try:
+        certificate = leaf_certificate(scan_result)
+        summary = get_certificate_metadata(scan_result)
+    except ValueError as e:
+        certificate, error = None, f"Unreadable certificate: {e}"
+        summary = dict.fromkeys(METADATA_FIELDS)
+    summary.update({
+        "host": scan_result.get("host"),
+        "port": scan_result.get("port"),
+        "address": scan_result.get("address"),
+        "days_remaining": certificate.days_remaining() if certificate else None,
+        "subject_alt_names": [value for kind, value in certificate.subject_alt_names] if certificate else [],
+        "hostname_match": certificate.matches(scan_result.get("server_name") or scan_result.get("host")) if certificate else None,
+        "key_type": certificate.key_type if certificate else None,
+        "key_size": certificate.key_size if certificate else None,
+        "signature_algorithm": certificate.signature_algorithm if certificate else None,
+        "chain": [hashlib.sha256(der).hexdigest() for der in scan_result.get("chain") or ()],
+        "protocol": scan_result.get("protocol"),
+        "cipher": scan_result.get("cipher"),
+        "connect_time": scan_result.get("connect_time"),
+        "handshake_time": scan_result.get("handshake_time"),
+        "error": error,
+    })
+    return summary
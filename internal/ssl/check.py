@@ -1,95 +1,51 @@
+import time
 import streamlit as st
-import ssl
-import socket
-from datetime import datetime
-import certifi
-import pandas as pd
+from internal.ssl.scanner import scan_ssl_certificate, DEFAULT_PORT
+from internal.ssl.certificate import leaf_certificate, format_name, format_cert_time
+from internal.cache import memoize, remember_check
 
-def check_ssl_certificate(domain):
-    """
-    Check the SSL certificate of a given domain.
-    
-    Args:
-        domain (str): The domain to check the SSL certificate for.
-        
-    Returns:
-        dict: A dictionary containing the SSL certificate details if the certificate is valid, otherwise None.
-    """
-    try:
-        context = ssl.create_default_context()
-        context.minimum_version = ssl.TLSVersion.TLSv1_2
-        context.options |= ssl.OP_NO_TLSv1
-        context.options |= ssl.OP_NO_TLSv1_1
-        context.load_verify_locations(certifi.where())
-        
-        with socket.create_connection((domain, 443)) as sock:
-            with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                cert = ssock.getpeercert()
-                
-        if cert is not None:
-            return cert
-        else:
-            return None
-        
-    except ssl.SSLError as e:
-        if "unknown protocol" in str(e) or "unsupported protocol" in str(e):
-            raise Exception("The server does not support TLS 1.2 or TLS 1.3.")
-        else:
-            raise e
-    except Exception as e:
-        raise e
+# Page results are kept for a few minutes so reruns don't repeat the handshake, failures are retried
+cached_scan_ssl_certificate = memoize("ssl_check", ttl=300, cache_if=lambda result: not result["error"])(scan_ssl_certificate)
 
-import pandas as pd
-from datetime import datetime
+def format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(timestamp))
 
-def display_ssl_certificate_details(cert):
+def display_ssl_certificate_details(certificate, scan_result=None):
     """
     Display SSL certificate details in a prettier format using Streamlit.
     
     Args:
-        cert (dict): A dictionary containing the SSL certificate details.
+        certificate (Certificate): The parsed certificate, see internal.ssl.certificate.
+        scan_result (dict): Optional scan result to show the connection details from.
     """
-    cert_details = []
-    
-    if 'subject' in cert and cert['subject'] is not None:
-        subject = ", ".join([f"{v}" for k, v in cert['subject'][0]])
-        cert_details.append(["Subject", subject])
-        
-    if 'issuer' in cert and cert['issuer'] is not None:
-        issuer = ", ".join([f"{v}" for k, v in cert['issuer'][0]])
-        cert_details.append(["Issuer", issuer])
+    cert_details = [
+        ["Subject", format_name(certificate.subject)],
+        ["Issuer", format_name(certificate.issuer)],
+        ["Version", certificate.version],
+        ["Serial Number", certificate.serial],
+        ["Valid From", format_time(certificate.not_before)],
+        ["Valid To", format_time(certificate.not_after)],
+        ["Subject Alt Names", ", ".join(value for _, value in certificate.subject_alt_names)],
+        ["Public Key", f"{certificate.key_type} {certificate.key_size} bits" if certificate.key_size else certificate.key_type],
+        ["Signature Algorithm", certificate.signature_algorithm],
+        ["SHA-256 Fingerprint", certificate.fingerprint],
+    ]
+    if certificate.ocsp:
+        cert_details.append(["OCSP", certificate.ocsp[0]])
+    if certificate.ca_issuers:
+        cert_details.append(["CA Issuers", certificate.ca_issuers[0]])
         
-    if 'version' in cert:
-        cert_details.append(["Version", str(cert['version'])])
+    if scan_result is not None:
+        cert_details.append(["Protocol", scan_result["protocol"]])
+        cert_details.append(["Cipher", scan_result["cipher"]])
+        cert_details.append(["Certificates in Chain", len(scan_result["chain"])])
+        if scan_result["connect_time"] is not None:
+            cert_details.append(["Connect Time", f"{scan_result['connect_time'] * 1000:.1f} ms"])
+        if scan_result["handshake_time"] is not None:
+            cert_details.append(["Handshake Time", f"{scan_result['handshake_time'] * 1000:.1f} ms"])
         
-    if 'serialNumber' in cert:
-        cert_details.append(["Serial Number", str(cert['serialNumber'])])
-        
-    if 'notBefore' in cert:
-        not_before = datetime.strptime(cert['notBefore'], '%b %d %H:%M:%S %Y %Z')
-        cert_details.append(["Valid From", not_before.strftime('%Y-%m-%d %H:%M:%S %Z')])
-        
-    if 'notAfter' in cert:
-        not_after = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
-        cert_details.append(["Valid To", not_after.strftime('%Y-%m-%d %H:%M:%S %Z')])
-        
-    if 'subjectAltName' in cert and cert['subjectAltName'] is not None:
-        subject_alt_names = ", ".join([item[1] for item in cert['subjectAltName']])
-        cert_details.append(["Subject Alt Names", subject_alt_names])
-        
-    if 'OCSP' in cert:
-        cert_details.append(["OCSP", cert['OCSP'][0]])
-        
-    if 'caIssuers' in cert:
-        cert_details.append(["CA Issuers", cert['caIssuers'][0]])
-        
-    # Convert all values to strings
-    cert_details = [[str(field), str(value)] for field, value in cert_details]
-    
-    # Convert the list to a DataFrame
-    df = pd.DataFrame(cert_details, columns=['Field', 'Value'])
-    # Display the DataFrame without the index using st.write
-    st.write(df.set_index('Field'))
+    # Two plain columns, a single certificate doesn't need a DataFrame
+    st.dataframe({"Field": [field for field, _ in cert_details], "Value": [str(value) for _, value in cert_details]}, hide_index=True)
 
 def invoke_ssl_check():
     st.write("# SSL Check")
@@ -100,27 +56,31 @@ def invoke_ssl_check():
     """
     )
     domain = st.text_input("Domain", "example.com", key="ssl_check_domain")
-    if st.button("Check", key="ssl_check_check"):
+    port = st.number_input("Port", 1, 65535, DEFAULT_PORT, key="ssl_check_port")
+    if remember_check("ssl_check_checked", st.button("Check", key="ssl_check_check"), domain=domain, port=port):
         with st.spinner("Checking..."):
             try:
-                cert = check_ssl_certificate(domain)
-                if cert is not None:
-                    if 'notAfter' in cert:
-                        not_after = cert['notAfter']
-                        if isinstance(not_after, str):
-                            expiry_date = datetime.strptime(not_after, '%b %d %H:%M:%S %Y %Z')
-                            remaining = expiry_date - datetime.now()
-                            if remaining.days < 0:
-                                st.error("The certificate has expired.")
-                            else:
-                                st.success(f"The certificate is valid for {remaining.days} days.")
-                            st.info(f"Valid to: {not_after}")
-                    
-                    st.divider()
-                    # Display the certificate details with a click on the button
-                    with st.expander("Show Certificate Details"):
-                        display_ssl_certificate_details(cert)
+                scan_result = cached_scan_ssl_certificate(domain, int(port), capture_failures=True)
+                certificate = leaf_certificate(scan_result)
+                if certificate is None:
+                    raise Exception(scan_result["error"] or "No SSL certificate found.")
+                if scan_result["error"]:
+                    # The certificates were captured without verification, show them with the reason
+                    st.error(f"The certificate is not trusted: {scan_result['error']}")
+
+                remaining = certificate.days_remaining()
+                if remaining < 0:
+                    st.error("The certificate has expired.")
+                elif scan_result["error"]:
+                    # Not valid while it isn't trusted, only report when it expires
+                    st.info(f"The certificate expires in {remaining} days.")
                 else:
-                    st.error("No SSL certificate found.")
+                    st.success(f"The certificate is valid for {remaining} days.")
+                st.info(f"Valid to: {format_cert_time(certificate.not_after)}")
+
+                st.divider()
+                # Display the certificate details with a click on the button
+                with st.expander("Show Certificate Details"):
+                    display_ssl_certificate_details(certificate, scan_result)
             except Exception as e:
-                st.error(f"Error: {str(e)}")
\ No newline at end of file
+                st.error(f"Error: {str(e)}")
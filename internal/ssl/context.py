@@ -0,0 +1,46 @@
+import ssl
+import threading
+import certifi
+
+_context = None
+_lock = threading.Lock()
+
+#MARK: - TLS Context
+def get_tls_context():
+    """
+    Return the shared client TLS context.
+
+    The context only allows TLS 1.2 and newer and trusts the certifi CA bundle.
+    It is built once per process, so the CA bundle is only parsed on first use.
+    """
+    global _context
+    if _context is None:
+        with _lock:
+            if _context is None:
+                context = ssl.create_default_context()
+                context.minimum_version = ssl.TLSVersion.TLSv1_2
+                context.options |= ssl.OP_NO_TLSv1
+                context.options |= ssl.OP_NO_TLSv1_1
+                context.load_verify_locations(certifi.where())
+                _context = context
+    return _context
+
+_inspection_context = None
+
+def get_inspection_context():
+    """
+    Return the shared client TLS context that accepts any certificate.
+
+    It is only used to look at the certificates of a server whose certificate
+    failed verification, never to trust a connection.
+    """
+    global _inspection_context
+    if _inspection_context is None:
+        with _lock:
+            if _inspection_context is None:
+                context = ssl.create_default_context()
+                context.minimum_version = ssl.TLSVersion.TLSv1_2
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+                _inspection_context = context
+    return _inspection_context
@@ -0,0 +1,67 @@
+import math
+import time
+import streamlit as st
+import pandas as pd
+from internal.ssl.monitor import get_monitor, DAY
+from internal.ssl.scanner import parse_target
+from internal.results import PAGE_SIZE
+
+#MARK: - Certificate Monitor
+def invoke_certificate_monitor():
+    st.write("# Certificate Monitor")
+    st.markdown(
+    """
+    The certificate monitor keeps a watch list of hosts and rescans their certificates in the background.
+    Certificates close to their expiry date or that changed recently are checked more often.
+    The table below is read from the monitor's database, no live connections are made when it is shown.
+    """
+    )
+    monitor = get_monitor()
+    store = monitor.store
+
+    target = st.text_input("Host", "example.com", key="certificate_monitor_host", help="host or host:port")
+    add_column, rescan_column, remove_column = st.columns(3)
+    host, port = parse_target(target or "")
+    if add_column.button("Watch", key="certificate_monitor_add") and host:
+        store.add(host, port)
+        monitor.wake()
+        st.success(f"{host}:{port} added to the watch list.")
+    if rescan_column.button("Rescan", key="certificate_monitor_rescan") and host:
+        store.schedule_now(host, port)
+        monitor.wake()
+        st.info(f"{host}:{port} will be rescanned shortly.")
+    if remove_column.button("Remove", key="certificate_monitor_remove") and host:
+        store.remove(host, port)
+        st.info(f"{host}:{port} removed from the watch list.")
+
+    st.divider()
+    expiring_days = st.number_input("Only show certificates expiring within days (0 = all)", 0, 3650, 0, key="certificate_monitor_days")
+    expiring_within = expiring_days * DAY if expiring_days else None
+    total = store.count(expiring_within)
+    st.write(f"Watching {store.count()} hosts.")
+    if not total:
+        return
+
+    # Only one page of the watch list is read from the database at a time
+    pages = math.ceil(total / PAGE_SIZE)
+    page = 1
+    if pages > 1:
+        if st.session_state.get("certificate_monitor_page", 1) > pages:
+            st.session_state["certificate_monitor_page"] = pages
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="certificate_monitor_page")
+    offset = (page - 1) * PAGE_SIZE
+    entries = store.entries(expiring_within, limit=PAGE_SIZE, offset=offset)
+    if not entries:
+        return
+
+    now = time.time()
+    df = pd.DataFrame(entries)
+    df["days_remaining"] = ((df["not_after"] - now) // DAY).astype("Int64")
+    for column in ["not_after", "scanned_at", "next_scan", "changed_at"]:
+        df[column] = pd.to_datetime(df[column], unit="s")
+    st.dataframe(
+        df[["host", "port", "days_remaining", "not_after", "subject", "issuer", "serial", "protocol", "changed_at", "scanned_at", "next_scan", "error"]],
+        hide_index=True,
+    )
+    if pages > 1:
+        st.caption(f"Rows {offset + 1} to {offset + len(entries)} of {total}.")
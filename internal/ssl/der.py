@@ -0,0 +1,92 @@
+import calendar
+
+# Universal ASN.1 tags used in X.509 certificates
+BOOLEAN = 0x01
+INTEGER = 0x02
+BIT_STRING = 0x03
+OCTET_STRING = 0x04
+NULL = 0x05
+OID = 0x06
+UTF8_STRING = 0x0C
+PRINTABLE_STRING = 0x13
+IA5_STRING = 0x16
+UTC_TIME = 0x17
+GENERALIZED_TIME = 0x18
+BMP_STRING = 0x1E
+SEQUENCE = 0x30
+SET = 0x31
+
+#MARK: - Reader
+def read_element(data, offset=0):
+    """
+    Read one DER element (tag, length, value) from data at offset.
+
+    Returns:
+        tuple: (tag, value, end) with the tag byte, the value as a memoryview and the offset after the element.
+
+    Raises:
+        ValueError: If the element is truncated or uses a form DER doesn't allow.
+    """
+    if offset + 2 > len(data):
+        raise ValueError("Truncated DER element")
+    tag = data[offset]
+    if tag & 0x1F == 0x1F:
+        raise ValueError("Multi-byte DER tags are not supported")
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        if size == 0 or size > 4 or offset + size > len(data):
+            raise ValueError("Invalid DER length")
+        length = int.from_bytes(data[offset:offset + size], "big")
+        offset += size
+    end = offset + length
+    if end > len(data):
+        raise ValueError("Truncated DER element")
+    return tag, memoryview(data)[offset:end], end
+
+def read_children(data):
+    """Return the (tag, value) pairs of the elements in a constructed value."""
+    children = []
+    offset = 0
+    while offset < len(data):
+        tag, value, offset = read_element(data, offset)
+        children.append((tag, value))
+    return children
+
+#MARK: - Values
+def decode_oid(value):
+    """Decode an OBJECT IDENTIFIER into its dotted form, e.g. "2.5.4.3"."""
+    arcs = []
+    current = 0
+    for byte in bytes(value):
+        current = (current << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(current)
+            current = 0
+    if not arcs:
+        raise ValueError("Empty OID")
+    first = min(arcs[0] // 40, 2)
+    return ".".join(str(arc) for arc in [first, arcs[0] - 40 * first] + arcs[1:])
+
+def decode_integer(value):
+    return int.from_bytes(value, "big", signed=True)
+
+def decode_string(tag, value):
+    """Decode the string types used in names and extensions."""
+    if tag == BMP_STRING:
+        return bytes(value).decode("utf-16-be", "replace")
+    if tag == UTF8_STRING:
+        return bytes(value).decode("utf-8", "replace")
+    return bytes(value).decode("latin-1")
+
+def decode_time(tag, value):
+    """Decode a UTCTime or GeneralizedTime into a Unix timestamp."""
+    text = bytes(value).decode("ascii")
+    if not text.endswith("Z"):
+        raise ValueError(f"Certificate time {text!r} is not in UTC")
+    if tag == UTC_TIME:
+        # RFC 5280: two digit years from 50 are 19xx, the others 20xx
+        year = int(text[:2])
+        text = f"{1900 + year if year >= 50 else 2000 + year}{text[2:]}"
+    return calendar.timegm((int(text[0:4]), int(text[4:6]), int(text[6:8]), int(text[8:10]), int(text[10:12]), int(text[12:14])))
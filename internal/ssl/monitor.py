@@ -0,0 +1,213 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from internal.ssl.certificate import get_certificate_metadata
+from internal.ssl.scanner import scan
+
+logger = logging.getLogger(__name__)
+
+DATABASE_PATH = os.environ.get("DNSTOOLBOX_MONITOR_DB", "certificates.db")
+
+# How often the monitor looks for due rescans and how many hosts it scans per round
+POLL_INTERVAL = 30.0
+BATCH_SIZE = 500
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS certificates (
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    next_scan REAL NOT NULL,
+    scanned_at REAL,
+    changed_at REAL,
+    fingerprint TEXT,
+    subject TEXT,
+    issuer TEXT,
+    serial TEXT,
+    not_before REAL,
+    not_after REAL,
+    protocol TEXT,
+    error TEXT,
+    failures INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (host, port)
+);
+CREATE INDEX IF NOT EXISTS certificates_next_scan ON certificates (next_scan);
+CREATE INDEX IF NOT EXISTS certificates_not_after ON certificates (not_after);
+"""
+
+#MARK: - Schedule
+def next_scan_interval(not_after, now, changed=False, failures=0):
+    """
+    Return the number of seconds until a certificate should be scanned again.
+
+    Certificates far from expiry are scanned daily, certificates close to
+    expiry or that just changed are scanned more often. Failing hosts back off
+    from 15 minutes up to a day.
+    """
+    if failures:
+        return min(DAY, 15 * MINUTE * 2 ** (failures - 1))
+    if changed:
+        return 15 * MINUTE
+    days_remaining = (not_after - now) / DAY
+    if days_remaining <= 7:
+        return HOUR
+    if days_remaining <= 30:
+        return 6 * HOUR
+    return DAY
+
+#MARK: - Store
+class CertificateStore:
+    """SQLite backed watch list holding the last scan result of every watched host."""
+
+    def __init__(self, path=DATABASE_PATH):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def add(self, host, port=443):
+        """Add a host to the watch list and schedule it for an immediate scan."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO certificates (host, port, added_at, next_scan) VALUES (?, ?, ?, 0)",
+                (host.lower(), port, time.time()),
+            )
+
+    def remove(self, host, port=443):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM certificates WHERE host = ? AND port = ?", (host.lower(), port))
+
+    def schedule_now(self, host, port=443):
+        """Scan a host in the next monitor round."""
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE certificates SET next_scan = 0 WHERE host = ? AND port = ?", (host.lower(), port))
+
+    def due(self, now, limit=BATCH_SIZE):
+        """Return (host, port) pairs whose rescan is due."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT host, port FROM certificates WHERE next_scan <= ? ORDER BY next_scan LIMIT ?", (now, limit)
+            ).fetchall()
+        return [(row["host"], row["port"]) for row in rows]
+
+    def record(self, scan_result, now):
+        """Store a scan result and schedule the next scan of the host."""
+        key = (scan_result["host"], scan_result["port"])
+        with self._lock, self._connection:
+            previous = self._connection.execute(
+                "SELECT fingerprint, not_after, failures FROM certificates WHERE host = ? AND port = ?", key
+            ).fetchone()
+            if previous is None:
+                return
+
+            # Failed verifications come with the captured chain, so expired and untrusted certificates keep their dates
+            error = scan_result["error"]
+            try:
+                metadata = get_certificate_metadata(scan_result)
+            except ValueError as e:
+                # A certificate the DER reader rejects fails the scan, so the host backs off like any other failure
+                metadata, error = {"fingerprint": None}, f"Unreadable certificate: {e}"
+            failures = previous["failures"] + 1 if error else 0
+            if metadata["fingerprint"] is None:
+                self._connection.execute(
+                    "UPDATE certificates SET scanned_at = ?, error = ?, failures = ?, next_scan = ? WHERE host = ? AND port = ?",
+                    (now, error, failures, now + next_scan_interval(previous["not_after"], now, failures=failures)) + key,
+                )
+                return
+
+            changed = previous["fingerprint"] is not None and previous["fingerprint"] != metadata["fingerprint"]
+            interval = next_scan_interval(metadata["not_after"] or now, now, changed=changed, failures=failures)
+            self._connection.execute(
+                """
+                UPDATE certificates SET scanned_at = ?, changed_at = COALESCE(?, changed_at), fingerprint = ?, subject = ?, issuer = ?,
+                    serial = ?, not_before = ?, not_after = ?, protocol = ?, error = ?, failures = ?, next_scan = ?
+                WHERE host = ? AND port = ?
+                """,
+                (
+                    now, now if changed else None, metadata["fingerprint"], metadata["subject"], metadata["issuer"],
+                    metadata["serial"], metadata["not_before"], metadata["not_after"], scan_result["protocol"],
+                    error, failures, now + interval,
+                ) + key,
+            )
+
+    def entries(self, expiring_within=None, limit=1000, offset=0):
+        """
+        Return the watched certificates ordered by expiry date, soonest first.
+
+        Args:
+            expiring_within (float): Only return certificates expiring within this many seconds.
+            limit (int): Maximum number of rows.
+            offset (int): Number of rows to skip.
+        """
+        query, params = self._filter("SELECT * FROM certificates", expiring_within)
+        query += " ORDER BY not_after IS NULL, not_after LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(query, params).fetchall()]
+
+    def count(self, expiring_within=None):
+        """Return the number of watched certificates, or of those expiring within this many seconds."""
+        query, params = self._filter("SELECT COUNT(*) FROM certificates", expiring_within)
+        with self._lock:
+            return self._connection.execute(query, params).fetchone()[0]
+
+    @staticmethod
+    def _filter(query, expiring_within):
+        if expiring_within is None:
+            return query, []
+        return query + " WHERE not_after <= ?", [time.time() + expiring_within]
+
+#MARK: - Monitor
+class CertificateMonitor:
+    """Background thread rescanning the watched hosts whenever they are due."""
+
+    def __init__(self, store, poll_interval=POLL_INTERVAL):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="certificate-monitor", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def wake(self):
+        """Start the next round right away instead of waiting for the poll interval."""
+        self._wakeup.set()
+
+    def run_once(self, now=None):
+        """Scan all due hosts and return how many were scanned."""
+        now = now or time.time()
+        targets = self.store.due(now)
+        for result in scan(targets, capture_failures=True) if targets else ():
+            self.store.record(result, time.time())
+        return len(targets)
+
+    def _run(self):
+        while True:
+            try:
+                scanned = self.run_once()
+            except Exception:
+                logger.exception("Certificate monitor round failed")
+                scanned = 0
+            if scanned < BATCH_SIZE:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_monitor():
+    """Return the process-wide monitor, starting it on first use."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = CertificateMonitor(CertificateStore())
+            _monitor.start()
+    return _monitor
@@ -0,0 +1,247 @@
+import asyncio
+import socket
+import ssl
+import time
+from internal.dns.client import split_nameserver
+from internal.metrics import METRICS
+from internal.ssl.context import get_tls_context, get_inspection_context
+
+DEFAULT_PORT = 443
+CONNECT_TIMEOUT = 5.0
+HANDSHAKE_TIMEOUT = 5.0
+MAX_CONCURRENT_SCANS = 200
+
+#MARK: - Targets
+def parse_target(target, default_port=DEFAULT_PORT):
+    """
+    Split a "host", "host:port" or "[IPv6]:port" string into (host, port).
+
+    Tuples are passed through, so callers may mix strings and (host, port) pairs.
+    """
+    if isinstance(target, tuple):
+        return target[0], int(target[1])
+    return split_nameserver(target.strip(), default_port=default_port)
+
+def _unverified_chain(ssl_object):
+    """
+    Return the presented chain through CPython internals, or None if they are not available.
+
+    Before Python 3.13, get_unverified_chain() is only a method of the private
+    _ssl object behind an SSLObject, and returns _ssl.Certificate objects that
+    are encoded with the private _ssl.ENCODING_DER. Neither is a public API, so
+    any change to them makes this return None instead of failing the scan.
+    """
+    try:
+        import _ssl
+        certificates = ssl_object._sslobj.get_unverified_chain()
+        return [cert if isinstance(cert, bytes) else cert.public_bytes(_ssl.ENCODING_DER) for cert in certificates or []]
+    except (ImportError, AttributeError, TypeError):
+        return None
+
+def get_presented_chain(ssl_object):
+    """
+    Return the certificates sent by the server as a list of DER encoded bytes, leaf first.
+
+    Python 3.13 exposes the chain as SSLObject.get_unverified_chain(). Older
+    versions read it through CPython internals, see _unverified_chain. If
+    neither works, this falls back to the leaf certificate from
+    getpeercert(binary_form=True).
+    """
+    get_chain = getattr(ssl_object, "get_unverified_chain", None)
+    chain = get_chain() if get_chain is not None else _unverified_chain(ssl_object)
+    if chain is None:
+        leaf = ssl_object.getpeercert(binary_form=True)
+        return [leaf] if leaf else []
+    return list(chain)
+
+def describe_error(error):
+    """Turn a scan exception into a readable message."""
+    if isinstance(error, ssl.SSLError) and ("unknown protocol" in str(error) or "unsupported protocol" in str(error)):
+        return "The server does not support TLS 1.2 or TLS 1.3."
+    return str(error) or type(error).__name__
+
+def new_result(host, port, server_name=None, address=None):
+    """Return an empty scan result for a target."""
+    return {
+        "host": host, "port": port, "server_name": server_name or host, "address": address,
+        "cert": None, "chain": [], "protocol": None, "cipher": None,
+        "connect_time": None, "handshake_time": None, "error": None,
+    }
+
+#MARK: - Scanner
+async def capture_unverified(result, host, port, server_name, connect_timeout, handshake_timeout):
+    """
+    Repeat a handshake that failed verification without verifying, to capture the presented certificates.
+
+    The verification error stays the error of the result, this only fills in
+    the chain, protocol and cipher. Failures of the second handshake are ignored.
+    """
+    loop = asyncio.get_running_loop()
+    transport = None
+    try:
+        transport, protocol = await asyncio.wait_for(
+            loop.create_connection(asyncio.Protocol, result["address"] or host, port), connect_timeout
+        )
+        transport = await loop.start_tls(
+            transport, protocol, get_inspection_context(),
+            server_hostname=server_name, ssl_handshake_timeout=handshake_timeout,
+        )
+        ssl_object = transport.get_extra_info("ssl_object")
+        result["chain"] = get_presented_chain(ssl_object)
+        result["protocol"] = ssl_object.version()
+        result["cipher"] = ssl_object.cipher()[0]
+    except Exception:
+        pass
+    finally:
+        if transport is not None:
+            transport.abort()
+
+async def scan_target(host, port=DEFAULT_PORT, server_name=None, address=None, context=None,
+                      connect_timeout=CONNECT_TIMEOUT, handshake_timeout=HANDSHAKE_TIMEOUT, capture_failures=False):
+    """
+    Connect to host:port, perform a TLS handshake and capture the presented certificates.
+
+    Args:
+        host (str): The host to connect to.
+        port (int): The TLS port.
+        server_name (str): The SNI name and the name the certificate is verified against, defaults to host.
+        address (str): An already resolved address of the host, skips the DNS lookup.
+        context (ssl.SSLContext): Context used for the handshake, defaults to the shared verifying context.
+        connect_timeout (float): Deadline for resolving and connecting in seconds.
+        handshake_timeout (float): Deadline for the TLS handshake in seconds.
+        capture_failures (bool): If verification fails, capture the chain with a second, unverified handshake.
+
+    Returns:
+        dict: The leaf certificate ("cert", empty if it was not verified), the
+        presented "chain" as DER bytes (parse it with internal.ssl.certificate), the negotiated "protocol" and "cipher",
+        "connect_time" and "handshake_time" in seconds, and an "error" message
+        if the scan failed.
+    """
+    loop = asyncio.get_running_loop()
+    server_name = server_name or host
+    result = new_result(host, port, server_name, address)
+    transport = None
+    outcome = "ok"
+    try:
+        started = time.perf_counter()
+        try:
+            transport, protocol = await asyncio.wait_for(
+                loop.create_connection(asyncio.Protocol, address or host, port), connect_timeout
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Connection to {host}:{port} timed out.")
+        handshake_started = time.perf_counter()
+        result["connect_time"] = handshake_started - started
+        result["address"] = transport.get_extra_info("peername")[0]
+
+        try:
+            transport = await loop.start_tls(
+                transport, protocol, context or get_tls_context(),
+                server_hostname=server_name, ssl_handshake_timeout=handshake_timeout,
+            )
+        except (asyncio.TimeoutError, ConnectionAbortedError):
+            raise TimeoutError(f"TLS handshake with {host}:{port} timed out.")
+        result["handshake_time"] = time.perf_counter() - handshake_started
+
+        ssl_object = transport.get_extra_info("ssl_object")
+        result["cert"] = ssl_object.getpeercert()
+        result["chain"] = get_presented_chain(ssl_object)
+        result["protocol"] = ssl_object.version()
+        result["cipher"] = ssl_object.cipher()[0]
+    except ssl.SSLCertVerificationError as e:
+        # The chain is verified inside the handshake, the time until it was rejected is the verification timing
+        result["handshake_time"] = time.perf_counter() - handshake_started
+        result["error"], outcome = describe_error(e), "verify_failed"
+        if capture_failures and result["address"]:
+            await capture_unverified(result, host, port, server_name, connect_timeout, handshake_timeout)
+    except TimeoutError as e:
+        result["error"], outcome = describe_error(e), "timeout"
+    except Exception as e:
+        result["error"], outcome = describe_error(e), "error"
+    finally:
+        if transport is not None:
+            transport.abort()
+    if METRICS.enabled:
+        METRICS.record_tls_handshake(f"{host}:{port}", outcome, result["connect_time"], result["handshake_time"], result["protocol"])
+    return result
+
+async def scan_targets(targets, concurrency=MAX_CONCURRENT_SCANS, **kwargs):
+    """
+    Scan many targets concurrently and yield each result as soon as it is ready.
+
+    Each host name is resolved only once per batch, so targets sharing a host
+    (e.g. the same host on several ports) reuse the address and only differ in
+    the connection.
+
+    Args:
+        targets (iterable): "host[:port]" strings or (host, port) tuples.
+        concurrency (int): Maximum number of connections open at the same time.
+        **kwargs: Passed on to scan_target.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    addresses = {}
+
+    async def resolve(host, port):
+        if host not in addresses:
+            addresses[host] = asyncio.ensure_future(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        # Shield the shared lookup so a timeout of one target doesn't cancel it for the others
+        return (await asyncio.shield(addresses[host]))[0][4][0]
+
+    async def scan(host, port):
+        async with semaphore:
+            try:
+                address = await asyncio.wait_for(resolve(host, port), kwargs.get("connect_timeout", CONNECT_TIMEOUT))
+            except asyncio.TimeoutError:
+                return dict(new_result(host, port), error=f"Resolving {host} timed out.")
+            except Exception as e:
+                return dict(new_result(host, port), error=describe_error(e))
+            return await scan_target(host, port, address=address, **kwargs)
+
+    tasks = [asyncio.ensure_future(scan(*parse_target(target))) for target in targets]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def scan(targets, **kwargs):
+    """Scan targets from synchronous code and return the results in completion order."""
+    async def collect():
+        return [result async for result in scan_targets(targets, **kwargs)]
+    return asyncio.run(collect())
+
+#MARK: - Single Certificate
+def scan_ssl_certificate(domain, port=DEFAULT_PORT, timeout=None, capture_failures=False):
+    """
+    Scan the TLS endpoint of a given domain.
+
+    Args:
+        domain (str): The domain to check the SSL certificate for.
+        port (int): The TLS port.
+        timeout (float): Optional connect and handshake timeout in seconds.
+        capture_failures (bool): Also capture the certificates if they fail verification.
+
+    Returns:
+        dict: The scan result with the certificate, presented chain, protocol, cipher and timings.
+    """
+    timeout = timeout or CONNECT_TIMEOUT
+    return scan([(domain, port)], connect_timeout=timeout, handshake_timeout=timeout, capture_failures=capture_failures)[0]
+
+def check_ssl_certificate(domain, timeout=None, port=DEFAULT_PORT):
+    """
+    Check the SSL certificate of a given domain.
+
+    Args:
+        domain (str): The domain to check the SSL certificate for.
+        timeout (float): Optional connect and handshake timeout in seconds.
+        port (int): The TLS port.
+
+    Returns:
+        dict: A dictionary containing the SSL certificate details if the certificate is valid, otherwise None.
+    """
+    result = scan_ssl_certificate(domain, port, timeout)
+    if result["error"]:
+        raise Exception(result["error"])
+    return result["cert"] or None